@@ -0,0 +1,603 @@
+# aggregates.py
+import os
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache
+from sketches import HLL_PRECISION, KLL, QUANTILE_K, CoMoments, GroupedHyperLogLog, SpaceSaving, hash_keys
+
+EPOCH = pd.Timestamp("1970-01-01")
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+# Memory limit of each cache of per-view aggregates (cubes, sketches, memoized results)
+AGGREGATE_CACHE_MB = int(os.environ.get("EDA_AGGREGATE_CACHE_MB", 512))
+
+
+def nbytes(value):
+    """Approximate memory held by an aggregate: pandas objects, arrays, sketches and containers of them."""
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(item) for item in value)
+    if hasattr(value, "__dict__"):
+        return nbytes(vars(value))
+    return 0
+
+
+# Integer keys spanning at most this many values are coded by offset instead of hashing
+DENSE_RANGE_LIMIT = 1_000_000
+
+
+class Factorized:
+    """A key column as integer codes (-1 for missing) plus the key values."""
+
+    def __init__(self, codes, uniques):
+        self.codes = codes
+        self.uniques = uniques
+        self.size = len(uniques)
+        # Missing keys go to an extra trailing bin so reductions need no mask
+        self.bins = np.where(codes < 0, self.size, codes)
+
+    def bincount(self, weights=None):
+        return np.bincount(self.bins, weights=weights, minlength=self.size + 1)[:self.size]
+
+
+def factorize(series):
+    """Factorize a key column with as little hashing as possible.
+
+    Categoricals reuse their codes, booleans and small-range integers (the
+    calendar features) are coded by offset, anything else is hashed once.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return Factorized(series.cat.codes.to_numpy().astype("int64"), pd.Index(series.cat.categories))
+    if pd.api.types.is_bool_dtype(dtype):
+        values = series.to_numpy(dtype="int64", na_value=-1)
+        return Factorized(values, pd.Index([False, True]))
+    if pd.api.types.is_integer_dtype(dtype):
+        missing = series.isna().to_numpy()
+        values = series.to_numpy(dtype="int64", na_value=0)
+        if (~missing).any():
+            low, high = values[~missing].min(), values[~missing].max()
+            if high - low < DENSE_RANGE_LIMIT:
+                codes = np.where(missing, -1, values - low)
+                return Factorized(codes, pd.Index(np.arange(low, high + 1)))
+    codes, uniques = pd.factorize(series, sort=True)
+    return Factorized(codes.astype("int64"), pd.Index(uniques))
+
+
+class Aggregator:
+    """Shared-factorization group reductions over one frame.
+
+    Each key column is factorized once and reused by every measure; sums and
+    counts are single ``np.bincount`` passes over the codes. Results match
+    ``groupby(key).sum()`` / ``value_counts()``: groups with no rows are
+    dropped and missing values are skipped.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self._keys = {}
+        self._counts = {}
+        self._values = {}
+
+    def key(self, name):
+        if name not in self._keys:
+            self._keys[name] = factorize(self.df[name])
+        return self._keys[name]
+
+    def values(self, name):
+        if name not in self._values:
+            values = self.df[name].to_numpy(dtype="float64", na_value=np.nan)
+            self._values[name] = np.where(np.isnan(values), 0.0, values)
+        return self._values[name]
+
+    def counts(self, name):
+        """Rows per group of ``name``, aligned with its uniques."""
+        if name not in self._counts:
+            self._counts[name] = self.key(name).bincount()
+        return self._counts[name]
+
+    def sum(self, name, column='revenue'):
+        key = self.key(name)
+        sums = key.bincount(self.values(column))
+        observed = self.counts(name) > 0
+        return pd.Series(sums[observed], index=key.uniques[observed], name=column)
+
+    def value_counts(self, name):
+        key = self.key(name)
+        counts = self.counts(name)
+        observed = counts > 0
+        result = pd.Series(counts[observed], index=key.uniques[observed], name="count")
+        return result.sort_values(ascending=False, kind="stable")
+
+    def distinct(self, name):
+        """Number of distinct non-missing values of ``name``."""
+        return int((self.counts(name) > 0).sum())
+
+    def distinct_per_group(self, name, of):
+        """Distinct values of ``of`` per group of ``name`` (``groupby(name)[of].nunique()``)."""
+        key, other = self.key(name), self.key(of)
+        pairs = key.codes * other.size + other.codes
+        pairs = pd.unique(pairs[(key.codes >= 0) & (other.codes >= 0)])
+        distinct = np.bincount(pairs // other.size, minlength=key.size)
+        observed = self.counts(name) > 0
+        return pd.Series(distinct[observed], index=key.uniques[observed], name=of)
+
+
+def _decode(key, bins):
+    """Key values for ``bins`` codes, with the trailing missing bin as NA."""
+    missing = bins == key.size
+    if pd.api.types.is_integer_dtype(key.uniques.dtype):
+        values = np.append(key.uniques.to_numpy(dtype="int64"), 0)[bins]
+        return pd.arrays.IntegerArray(values.astype("int32"), missing)
+    return pd.Categorical.from_codes(np.where(missing, -1, bins), categories=key.uniques)
+
+
+def day_months(day):
+    """Months since 1970-01 for day numbers (days since 1970-01-01), keeping NA."""
+    days = np.asarray(day.to_numpy(dtype="int64", na_value=0))
+    months = days.astype("datetime64[D]").astype("datetime64[M]").astype("int64")
+    return pd.arrays.IntegerArray(months.astype("int32"), np.asarray(pd.isna(day)))
+
+
+def day_mask(day, bounds):
+    """Boolean mask of day numbers inside half-open ``(start, end)`` bounds."""
+    start, end = bounds
+    mask = day >= (start - EPOCH).days
+    if end is not None:
+        mask &= day < (end - EPOCH).days
+    return mask.fillna(False).to_numpy(dtype=bool)
+
+
+CUBE_DIMS = ["day", "category", "region", "payment_method", "hour"]
+CUBE_MEASURES = ["revenue", "revenue_rows", "rows"]
+
+# Cubes of whole datasets or date-filtered views, keyed by (dataset key, engine, bounds)
+CUBE_CACHE = LRUCache(max_entries=16, max_bytes=AGGREGATE_CACHE_MB * 1024 * 1024, sizeof=lambda cube: nbytes(cube.frame))
+
+
+class Cube:
+    """Revenue and row counts pre-aggregated by day x category x region x payment_method x hour.
+
+    ``frame`` has one row per observed combination (missing keys kept as NA)
+    and is typically a few hundred thousand rows at most, so every rollup,
+    filter or merge costs O(cube) rather than O(orders). Month, weekday and
+    weekend are derived from the day dimension.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    @classmethod
+    def from_frame(cls, df, agg=None):
+        agg = agg or Aggregator(df)
+        keys = [agg.key(dim) for dim in CUBE_DIMS]
+        combined = np.zeros(len(df), dtype="int64")
+        for key in keys:
+            combined = combined * (key.size + 1) + key.bins
+        codes, cells = pd.factorize(combined)
+        columns = {}
+        for key, dim in zip(reversed(keys), reversed(CUBE_DIMS)):
+            cells, bins = np.divmod(cells, key.size + 1)
+            columns[dim] = _decode(key, bins)
+        revenue = df['revenue'].to_numpy(dtype="float64", na_value=np.nan)
+        frame = pd.DataFrame({dim: columns[dim] for dim in CUBE_DIMS})
+        frame['revenue'] = np.bincount(codes, weights=agg.values('revenue'), minlength=len(frame))
+        frame['revenue_rows'] = np.bincount(codes, weights=~np.isnan(revenue), minlength=len(frame)).astype("int64")
+        frame['rows'] = np.bincount(codes, minlength=len(frame))
+        return cls(frame)
+
+    @classmethod
+    def empty(cls):
+        frame = pd.DataFrame({column: pd.Series(dtype="float64") for column in CUBE_DIMS + CUBE_MEASURES})
+        return cls(frame)
+
+    def merge(self, other):
+        """Combine two cubes, e.g. from different chunks or files."""
+        frame = pd.concat([self.frame, other.frame], ignore_index=True)
+        for dim in CUBE_DIMS:
+            if frame[dim].dtype == object:
+                frame[dim] = frame[dim].astype("category")
+        frame = frame.groupby(CUBE_DIMS, observed=True, dropna=False, sort=False)[CUBE_MEASURES].sum()
+        return Cube(frame.reset_index())
+
+    def filter(self, bounds=None):
+        """Restrict to the half-open ``(start, end)`` Timestamp range from ``loader.date_bounds``."""
+        if bounds is None:
+            return self
+        return Cube(self.frame[day_mask(self.frame['day'], bounds)].reset_index(drop=True))
+
+    def _dimension(self, dim):
+        if dim in self.frame:
+            return self.frame[dim]
+        day = self.frame['day']
+        days = day.to_numpy(dtype="int64", na_value=0)
+        missing = day.isna().to_numpy()
+        if dim == "month":
+            return day_months(day)
+        weekday = (days + 3) % 7
+        if dim == "dayofweek":
+            return pd.arrays.IntegerArray(weekday.astype("int8"), missing)
+        if dim == "is_weekend":
+            return (weekday >= 5) & ~missing
+        raise KeyError(dim)
+
+    def rollup(self, dim, measure="revenue"):
+        """Sum ``measure`` by one dimension (or month / dayofweek / is_weekend)."""
+        result = self.frame[measure].groupby(self._dimension(dim), observed=True).sum()
+        return result.rename_axis(dim)
+
+    def total(self, measure="revenue"):
+        return self.frame[measure].sum()
+
+    @property
+    def undated_rows(self):
+        return int(self.frame.loc[self.frame['day'].isna(), 'rows'].sum())
+
+
+def cached_cube(key, engine, load_frame, bounds=None):
+    """Cube of a dataset's rows within ``bounds``, built from ``load_frame()`` on first use.
+
+    ``load_frame`` returns the rows of that view only. A cached
+    whole-dataset cube answers every filter; without one, the filtered view
+    gets its own cube, so a pruned Parquet read never loads the full file.
+    """
+    cube = CUBE_CACHE.get((key, engine, None))
+    if cube is not None:
+        return cube.filter(bounds)
+    cube = CUBE_CACHE.get((key, engine, bounds))
+    if cube is None:
+        cube = Cube.from_frame(load_frame())
+        CUBE_CACHE.put((key, engine, bounds), cube)
+    return cube
+
+
+DISTINCT_COLUMNS = ["order_id", "customer_id"]
+
+# Distinct-count sketches of whole datasets or date-filtered views, keyed by (dataset key, engine, precision, bounds)
+SKETCH_CACHE = LRUCache(
+    max_entries=16, max_bytes=AGGREGATE_CACHE_MB * 1024 * 1024, sizeof=lambda distinct: distinct.nbytes,
+)
+
+
+class DailyDistinct:
+    """HyperLogLog sketches of distinct order and customer ids per day.
+
+    Like the cube they are built once per dataset and then answer totals,
+    per-day and per-month counts for any date filter, and merge across
+    chunks or files, without touching the rows again. Estimates have a
+    relative standard error of ``hll_error(precision)``.
+    """
+
+    def __init__(self, sketches, precision=HLL_PRECISION):
+        self.sketches = sketches
+        self.precision = precision
+
+    @classmethod
+    def from_frame(cls, df, agg=None, precision=HLL_PRECISION):
+        agg = agg or Aggregator(df)
+        day = agg.key('day')
+        groups = pd.Index(_decode(day, np.arange(day.size + 1)))
+        sketches = {}
+        for column in DISTINCT_COLUMNS:
+            key = agg.key(column)
+            valid = key.codes >= 0
+            sketches[column] = GroupedHyperLogLog.from_hashes(
+                groups, day.bins[valid], hash_keys(key)[valid], precision
+            )
+        return cls(sketches, precision)
+
+    @classmethod
+    def empty(cls, precision=HLL_PRECISION):
+        days = pd.Index(pd.array([], dtype="Int32"))
+        registers = np.zeros((0, 2 ** precision), dtype="uint8")
+        return cls({column: GroupedHyperLogLog(days, registers, precision) for column in DISTINCT_COLUMNS}, precision)
+
+    @property
+    def nbytes(self):
+        return sum(sketch.nbytes for sketch in self.sketches.values())
+
+    def merge(self, other):
+        return DailyDistinct(
+            {column: sketch.merge(other.sketches[column]) for column, sketch in self.sketches.items()},
+            self.precision,
+        )
+
+    def filter(self, bounds=None):
+        """Restrict to the half-open ``(start, end)`` Timestamp range from ``loader.date_bounds``."""
+        if bounds is None:
+            return self
+        return DailyDistinct(
+            {column: sketch.select(day_mask(sketch.groups, bounds)) for column, sketch in self.sketches.items()},
+            self.precision,
+        )
+
+    def count(self, column):
+        """Estimated distinct values of ``column`` over all days."""
+        return int(round(self.sketches[column].union().estimate()))
+
+    def per_day(self, column):
+        sketch = self.sketches[column]
+        return sketch.select(sketch.groups.notna()).estimates().rename_axis('day').rename(column)
+
+    def per_month(self, column):
+        sketch = self.sketches[column]
+        sketch = sketch.select(sketch.groups.notna())
+        return sketch.rollup(day_months(sketch.groups)).estimates().rename_axis('month').rename(column)
+
+
+def cached_distinct(key, engine, load_frame, precision=HLL_PRECISION, bounds=None):
+    """Distinct-count sketches of the rows within ``bounds``, cached like ``cached_cube``."""
+    distinct = SKETCH_CACHE.get((key, engine, precision, None))
+    if distinct is not None:
+        return distinct.filter(bounds)
+    distinct = SKETCH_CACHE.get((key, engine, precision, bounds))
+    if distinct is None:
+        distinct = DailyDistinct.from_frame(load_frame(), precision=precision)
+        SKETCH_CACHE.put((key, engine, precision, bounds), distinct)
+    return distinct
+
+
+# Revenue distributions are kept per discount rounded to this many decimals
+DISCOUNT_DECIMALS = 3
+
+PERCENTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+class PricingSketches:
+    """Distribution summaries behind the Pricing & Discounts charts.
+
+    ``price`` is a quantile sketch of prices. Discounts take few distinct
+    values, so ``discount`` counts rows per discount level (rounded to
+    ``DISCOUNT_DECIMALS``) exactly and ``revenue`` holds one revenue sketch
+    per level, which is enough to draw a revenue box for any range of
+    discounts. Memory is bounded by the sketch size times the number of
+    discount levels, not by the row count.
+    """
+
+    def __init__(self, price, discount, revenue, k=QUANTILE_K):
+        self.price = price
+        self.discount = discount
+        self.revenue = revenue
+        self.k = k
+
+    @classmethod
+    def empty(cls, k=QUANTILE_K):
+        return cls(KLL(k), pd.Series(dtype="int64"), {}, k)
+
+    @classmethod
+    def from_frame(cls, df, k=QUANTILE_K):
+        discount = np.round(df['discount'].to_numpy(dtype="float64", na_value=np.nan), DISCOUNT_DECIMALS)
+        revenue = df['revenue'].to_numpy(dtype="float64", na_value=np.nan)
+        codes, levels = pd.factorize(discount, sort=True)
+        valid = codes >= 0
+        codes, revenue = codes[valid], revenue[valid]
+        counts = np.bincount(codes, minlength=len(levels))
+        groups = np.split(revenue[np.argsort(codes, kind="stable")], np.cumsum(counts)[:-1])
+        return cls(
+            KLL(k).update(df['price'].to_numpy(dtype="float64", na_value=np.nan)),
+            pd.Series(counts, index=levels),
+            {float(level): KLL(k).update(values) for level, values in zip(levels, groups)},
+            k,
+        )
+
+    def merge(self, other):
+        revenue = dict(self.revenue)
+        for level, sketch in other.revenue.items():
+            revenue[level] = revenue[level].merge(sketch) if level in revenue else sketch
+        discount = self.discount.add(other.discount, fill_value=0).astype("int64").sort_index()
+        return PricingSketches(self.price.merge(other.price), discount, revenue, min(self.k, other.k))
+
+    def discount_quantiles(self, qs):
+        """``np.quantile`` of the (rounded) discounts, computed from the level counts."""
+        qs = np.asarray(qs, dtype="float64")
+        total = int(self.discount.sum())
+        if not total:
+            return np.full(qs.shape, np.nan)
+        levels = self.discount.index.to_numpy(dtype="float64")
+        ends = np.cumsum(self.discount.to_numpy())
+        position = qs * (total - 1)
+        low = levels[np.searchsorted(ends, np.floor(position), side="right")]
+        high = levels[np.searchsorted(ends, np.ceil(position), side="right")]
+        return low + (high - low) * (position - np.floor(position))
+
+    def percentiles(self, qs=PERCENTILES):
+        """Approximate ``df[['price', 'discount']].quantile(qs)``."""
+        return pd.DataFrame({'price': self.price.quantiles(qs), 'discount': self.discount_quantiles(qs)},
+                            index=pd.Index(qs))
+
+    def revenue_between(self, levels):
+        """One revenue sketch over the given discount levels."""
+        merged = KLL(self.k)
+        for level in levels:
+            merged = merged.merge(self.revenue[level])
+        return merged
+
+
+def _average(summary):
+    revenue_rows = summary.cube.total('revenue_rows')
+    return summary['total_revenue'] / revenue_rows if revenue_rows else float("nan")
+
+
+def _descending(series):
+    return series.sort_values(ascending=False, kind="stable")
+
+
+CORRELATION_COLUMNS = ['price', 'discount', 'quantity', 'revenue']
+
+# Measures answered by the cube alone: result name -> function of a Summary
+CUBE_RESULTS = {
+    "total_revenue": lambda s: float(s.cube.total('revenue')),
+    "avg_order_value": _average,
+    "nat_rows": lambda s: s.cube.undated_rows,
+    "daily": lambda s: s.cube.rollup('day'),
+    "monthly": lambda s: s.cube.rollup('month'),
+    "category_revenue": lambda s: s.cube.rollup('category'),
+    "region_revenue": lambda s: s.cube.rollup('region'),
+    "payment_counts": lambda s: _descending(s.cube.rollup('payment_method', 'rows')),
+    "dayofweek_counts": lambda s: _descending(s.cube.rollup('dayofweek', 'rows')),
+    "hourly_sales": lambda s: s.cube.rollup('hour'),
+    "weekend_sales": lambda s: s.cube.rollup('is_weekend'),
+}
+
+# Measures that need the order rows
+ROW_RESULTS = {
+    "total_orders": lambda s: s.agg.distinct('order_id'),
+    "unique_customers": lambda s: s.agg.distinct('customer_id'),
+    "product_revenue": lambda s: s.agg.sum('product_id'),
+    "orders_per_customer": lambda s: s.agg.distinct_per_group('customer_id', 'order_id'),
+    "revenue_per_customer": lambda s: s.agg.sum('customer_id'),
+    "top_products": lambda s: SpaceSaving.from_weights(s['product_revenue'], capacity=None),
+    "top_customers": lambda s: SpaceSaving.from_weights(s['revenue_per_customer'], capacity=None),
+    "daily_customers": lambda s: s.agg.distinct_per_group('day', 'customer_id').rename_axis('day'),
+    "monthly_customers": lambda s: s.agg.distinct_per_group('month', 'customer_id').rename_axis('month'),
+    "moments": lambda s: CoMoments.from_frame(s.df, CORRELATION_COLUMNS),
+    "correlations": lambda s: s['moments'].correlation(),
+    "covariance": lambda s: s['moments'].covariance(),
+    "rank_correlations": lambda s: s.df[CORRELATION_COLUMNS].astype("float64").corr(method="spearman"),
+    "percentiles": lambda s: s.df[['price', 'discount']].astype("float64").quantile(PERCENTILES),
+}
+
+RESULTS = {**CUBE_RESULTS, **ROW_RESULTS}
+
+# Approximate replacements for row measures, answered by ``DailyDistinct`` sketches
+SKETCH_RESULTS = {
+    "total_orders": lambda s: s.distinct.count('order_id'),
+    "unique_customers": lambda s: s.distinct.count('customer_id'),
+    "daily_customers": lambda s: s.distinct.per_day('customer_id'),
+    "monthly_customers": lambda s: s.distinct.per_month('customer_id'),
+}
+
+# Memoized measures per dataset view, see summary_store
+SUMMARY_STORES = LRUCache(
+    max_entries=16, max_bytes=AGGREGATE_CACHE_MB * 1024 * 1024, sizeof=lambda store: store.nbytes,
+)
+
+
+class SummaryStore(dict):
+    """Memo dict of one dataset view that keeps its size in ``SUMMARY_STORES`` current.
+
+    Each new result is measured once and the store is put again, so the
+    cache evicts other views when this one outgrows the memory limit.
+    """
+
+    def __init__(self, key):
+        super().__init__()
+        self.key = key
+        self.nbytes = 0
+
+    def __setitem__(self, name, value):
+        if name in self:
+            self.nbytes -= nbytes(self[name])
+        super().__setitem__(name, value)
+        self.nbytes += nbytes(value)
+        SUMMARY_STORES.put(self.key, self)
+
+
+class Summary(Mapping):
+    """Dashboard aggregates computed on first access.
+
+    Time, category, region and payment breakdowns are rolled up from
+    ``cube`` (built from ``df`` when not given), per-product and
+    per-customer figures come from the shared-factorization engine.
+    With ``approximate`` set, distinct counts come from the ``distinct``
+    HyperLogLog sketches (built from ``df`` when not given) instead of
+    exact hashing of the id columns. Results are memoized in ``store``,
+    which may outlive this object so a later rerun on the same data only
+    computes what it has not seen yet.
+    """
+
+    def __init__(self, df, cube=None, store=None, distinct=None, approximate=False):
+        self.df = df
+        self._cube = cube
+        self._distinct = distinct
+        self._agg = None
+        self.approximate = approximate
+        self.store = {} if store is None else store
+
+    @property
+    def agg(self):
+        if self._agg is None:
+            self._agg = Aggregator(self.df)
+        return self._agg
+
+    @property
+    def cube(self):
+        if self._cube is None:
+            self._cube = Cube.from_frame(self.df, self.agg)
+        return self._cube
+
+    @property
+    def distinct(self):
+        if self._distinct is None:
+            self._distinct = DailyDistinct.from_frame(self.df, self.agg)
+        return self._distinct
+
+    def __getitem__(self, name):
+        if name not in self.store:
+            compute = SKETCH_RESULTS.get(name) if self.approximate else None
+            self.store[name] = (compute or RESULTS[name])(self)
+        return self.store[name]
+
+    def __iter__(self):
+        return iter(RESULTS)
+
+    def __len__(self):
+        return len(RESULTS)
+
+
+def summary_store(*key):
+    """Persistent memo dict for one dataset view (e.g. dataset key, engine, date bounds)."""
+    store = SUMMARY_STORES.get(key)
+    if store is None:
+        store = SummaryStore(key)
+        SUMMARY_STORES.put(key, store)
+    return store
+
+
+def summarize_frame(df, cube=None, approximate=False):
+    """Compute every dashboard aggregate from an engineered order frame."""
+    return dict(Summary(df, cube, approximate=approximate))
+
+
+def summarize_cube(cube):
+    """The dashboard aggregates that a ``Cube`` can answer on its own."""
+    summary = Summary(None, cube)
+    return {name: summary[name] for name in CUBE_RESULTS}
+
+
+def new_vs_repeat(orders_per_customer):
+    return {
+        "New Customers": int((orders_per_customer == 1).sum()),
+        "Repeat Customers": int((orders_per_customer > 1).sum()),
+    }
+
+
+def category_share(category_revenue):
+    return (category_revenue / category_revenue.sum() * 100).sort_values(ascending=False)
+
+
+def label_days(series):
+    """Replace day-number keys (days since 1970-01-01) with dates."""
+    return series.set_axis(pd.to_datetime(series.index.to_numpy("int64"), unit="D"))
+
+
+def label_months(series):
+    """Replace month-index keys (months since 1970-01) with ``YYYY-MM`` strings."""
+    months = series.index.to_numpy("int64")
+    return series.set_axis([f"{1970 + m // 12}-{m % 12 + 1:02d}" for m in months])
+
+
+def label_weekdays(series):
+    """Replace weekday codes (Monday=0) with day names."""
+    return series.set_axis(np.asarray(DAY_NAMES)[series.index.to_numpy("int64")])
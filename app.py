@@ -1,141 +1,424 @@
 # ecommerce_eda.py
+import contextlib
+import time
+
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+import charts
+from aggregates import (
+    category_share,
+    label_days,
+    label_months,
+    label_weekdays,
+    new_vs_repeat,
+)
+from datasets import append_orders, dataset_names, load_dataset
+from dtypes import memory_report
+from loader import DEFAULT_ENGINE, ENGINES, LOAD_REPORTS, content_hash
+from pipeline import BACKENDS, available_backends, compute_results
+from profiling import PROFILE_LOG, Profile, activate, active
+from sketches import HLL_PRECISION, QUANTILE_K, hll_error
+from streaming import DEFAULT_CHUNK_ROWS, stream_rank_orders
 
 st.set_page_config(page_title="🛒 E-commerce EDA", layout="wide")
 st.title("🛒 E-commerce Exploratory Data Analysis")
+run_start = time.perf_counter()
 
-# Upload file
-uploaded_file = st.file_uploader("Upload your E-commerce CSV", type=["csv"])
+# Settings
+st.sidebar.header("⚙️ Settings")
+streaming = st.sidebar.toggle(
+    "Streaming mode",
+    help="Read the CSV in chunks and keep only running aggregates. "
+         "Use this for files that do not fit in memory.",
+)
+backend = st.sidebar.selectbox(
+    "Backend", available_backends(), format_func=BACKENDS.get, disabled=streaming,
+    help="Polars runs loading and every aggregation as one lazy, multi-threaded query "
+         "(exact counts only). Streaming mode always uses the chunked pandas path.",
+)
+# Backend-specific settings below are disabled (and ignored) for Polars
+use_polars = backend == "polars" and not streaming
+engine = st.sidebar.selectbox(
+    "CSV parser", list(ENGINES), index=list(ENGINES).index(DEFAULT_ENGINE),
+    format_func=ENGINES.get, disabled=streaming or use_polars,
+)
+chunk_rows = st.sidebar.number_input(
+    "Rows per chunk", min_value=10_000, max_value=10_000_000,
+    value=DEFAULT_CHUNK_ROWS, step=100_000, disabled=not streaming,
+)
+approximate = st.sidebar.toggle(
+    "Approximate aggregates",
+    help=f"Count orders and customers with HyperLogLog sketches ({2 ** HLL_PRECISION // 1024} KB each) "
+         "that merge across chunks and date filters instead of hashing every id. In streaming mode, "
+         "top products and customers come from bounded SpaceSaving summaries as well.",
+    disabled=use_polars,
+) and not use_polars
+downcast = st.sidebar.toggle(
+    "Downcast columns", disabled=streaming or use_polars,
+    help="Store the loaded frame with the smallest lossless dtypes (narrower integers, "
+         "integer ids instead of labels, categoricals). Results are unchanged, see 🧮 Memory Profile.",
+) and not use_polars
+profiling = st.sidebar.toggle(
+    "Profile reruns", key="profiling",
+    help="Record wall time, CPU time and memory change of loading and of each section "
+         f"on every rerun, shown below and appended to {PROFILE_LOG}.",
+)
+# Instrumented stages (loader, streaming, sections) record into the active profile
+profile = Profile() if profiling else None
+activate(profile)
 
-if uploaded_file:
-    # Load data
-    df = pd.read_csv(uploaded_file)
-
-    # Convert date
-    df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
-
-    # Feature engineering
-    df['revenue'] = df['quantity'] * df['price'] * (1 - df['discount'])
-    df['day'] = df['order_date'].dt.date
-    df['month'] = df['order_date'].dt.to_period("M").astype(str)
-    df['hour'] = df['order_date'].dt.hour
-    df['dayofweek'] = df['order_date'].dt.day_name()
-
-    # -------------------------
-    # 📌 Key Metrics
-    # -------------------------
-    st.header("📌 Business KPIs")
+date_range = st.sidebar.date_input(
+    "Order date filter", value=(),
+    help="Only analyse orders in this range. Parquet row groups outside it are skipped.",
+)
+
+# Saved datasets keep running aggregates and grow one appended file at a time
+st.sidebar.header("📁 Saved datasets")
+if "appended_to" in st.session_state:
+    # Switch to the dataset that was just appended to (set before its selectbox exists)
+    st.session_state["saved"] = st.session_state.pop("appended_to")
+saved = st.sidebar.selectbox(
+    "Show", [None, *dataset_names()], format_func=lambda name: name or "Uploaded file", key="saved",
+)
+with st.sidebar.expander("Append order files"):
+    append_to = st.text_input("Dataset name", value=saved or "")
+    new_files = st.file_uploader(
+        "New order files", type=["csv", "parquet", "feather", "arrow"],
+        accept_multiple_files=True, key="append_files",
+    )
+    if st.button("Append", disabled=not (append_to and new_files)):
+        try:
+            for new_file in new_files:
+                _, appended = append_orders(append_to, new_file.getvalue(), new_file.name, int(chunk_rows), approximate)
+                st.toast(f"{new_file.name}: {'appended' if appended else 'already in the dataset, skipped'}")
+        except ValueError as error:
+            st.error(str(error))
+        else:
+            st.session_state["appended_to"] = append_to
+            st.rerun()
+
+
+def dashboard_section(title, opened=False):
+    """Render a section as an independently rerunning fragment.
+
+    The section's toggle and widgets live inside the fragment, so using them
+    only re-executes this section, and its data is only computed while it
+    is open. The caption compares its own run time with a full rerun; with
+    profiling on, the section is also recorded as a stage.
+    """
+    def decorate(render):
+        @st.fragment
+        def run(results, df, view):
+            if not st.toggle(title, value=opened, key=f"section:{title}"):
+                return
+            # A rerun of this fragment alone is profiled and logged on its own
+            profile = active()
+            fragment_profile = profile is None and st.session_state.get("profiling", False)
+            if fragment_profile:
+                profile = Profile(kind="section")
+            start = time.perf_counter()
+            with profile.stage(title) if profile else contextlib.nullcontext():
+                st.header(title)
+                render(results, df, view)
+            st.caption(f"⏱ Section rerun: {(time.perf_counter() - start) * 1000:,.0f} ms")
+            if fragment_profile:
+                profile.write()
+        return run
+    return decorate
+
+
+def top_k_caption(summary, top, noun):
+    """Error bounds of an approximate top-k table (nothing in exact mode)."""
+    if summary.exact:
+        return
+    st.caption(
+        f"Approximate: revenues are overestimated by at most ${top['error'].max():,.0f}, "
+        f"{noun} not listed have at most ${summary.floor:,.0f}. "
+        f"{int(top['guaranteed'].sum())} of {len(top)} are guaranteed to be in the true top {len(top)}."
+    )
+
+
+# -------------------------
+# 📌 Key Metrics
+# -------------------------
+@dashboard_section("📌 Business KPIs", opened=True)
+def kpi_section(results, df, view):
     col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Total Revenue", f"${df['revenue'].sum():,.0f}")
-    col2.metric("Total Orders", df['order_id'].nunique())
-    col3.metric("Unique Customers", df['customer_id'].nunique())
-    col4.metric("Avg Order Value", f"${df['revenue'].mean():.2f}")
-
-    # -------------------------
-    # ⏳ Sales Trends
-    # -------------------------
-    st.header("⏳ Sales Trends")
-    daily = df.groupby('day')['revenue'].sum()
-    monthly = df.groupby('month')['revenue'].sum()
+    # Distinct counts are HyperLogLog estimates in approximate mode
+    error = f"Estimate, ±{2 * hll_error():.1%} at 95% confidence" if approximate else None
+    col1.metric("Total Revenue", f"${results['total_revenue']:,.0f}")
+    col2.metric("Total Orders", results['total_orders'], help=error)
+    col3.metric("Unique Customers", results['unique_customers'], help=error)
+    col4.metric("Avg Order Value", f"${results['avg_order_value']:.2f}")
+
 
+# -------------------------
+# ⏳ Sales Trends
+# -------------------------
+@dashboard_section("⏳ Sales Trends")
+def trends_section(results, df, view):
+    window = st.slider("Daily rolling average (days)", 1, 30, 1)
     col1, col2 = st.columns(2)
     with col1:
         st.subheader("Daily Revenue Trend")
-        st.line_chart(daily)
+        st.line_chart(label_days(results['daily']).rolling(window, min_periods=1).mean())
     with col2:
         st.subheader("Monthly Revenue Trend")
-        st.line_chart(monthly)
+        st.line_chart(label_months(results['monthly']))
+
 
-    # -------------------------
-    # 🛍️ Product Insights
-    # -------------------------
-    st.header("🛍️ Product Insights")
-    st.subheader("Top 10 Products by Revenue")
-    top_products = df.groupby("product_id")['revenue'].sum().nlargest(10)
-    st.bar_chart(top_products)
+# -------------------------
+# 🛍️ Product Insights
+# -------------------------
+@dashboard_section("🛍️ Product Insights")
+def product_section(results, df, view):
+    top_n = st.slider("Products shown", 5, 50, 10)
+    st.subheader(f"Top {top_n} Products by Revenue")
+    top = results['top_products'].top(top_n)
+    st.bar_chart(top['revenue'])
+    top_k_caption(results['top_products'], top, "products")
 
     st.subheader("Category Revenue Share (%)")
-    category_revenue = df.groupby("category")['revenue'].sum()
-    st.bar_chart((category_revenue / category_revenue.sum() * 100).sort_values(ascending=False))
+    st.bar_chart(category_share(results['category_revenue']))
 
-    # -------------------------
-    # 👤 Customer Insights
-    # -------------------------
-    st.header("👤 Customer Insights")
-    orders_per_customer = df.groupby("customer_id")['order_id'].nunique()
-    revenue_per_customer = df.groupby("customer_id")['revenue'].sum()
+
+# -------------------------
+# 👤 Customer Insights
+# -------------------------
+@dashboard_section("👤 Customer Insights")
+def customer_section(results, df, view):
+    # Approximate streaming keeps no per-customer state
+    revenue_per_customer = results.get('revenue_per_customer')
+    col1, col2 = st.columns(2)
+    bins = col1.slider("Lifetime revenue bins", 10, 100, 30, disabled=revenue_per_customer is None)
+    top_n = col2.slider("Customers shown", 5, 100, 10)
 
     st.subheader("New vs Repeat Customers")
-    repeat = (orders_per_customer > 1).sum()
-    new = (orders_per_customer == 1).sum()
-    st.bar_chart({"New Customers": new, "Repeat Customers": repeat})
+    if revenue_per_customer is None:
+        st.info("Per-customer charts need exact aggregates in streaming mode.")
+    else:
+        st.bar_chart(new_vs_repeat(results['orders_per_customer']))
+
+    st.subheader("Active Customers" + (f" (±{2 * hll_error():.1%})" if approximate else ""))
+    col1, col2 = st.columns(2)
+    col1.line_chart(label_days(results['daily_customers']))
+    col2.line_chart(label_months(results['monthly_customers']))
 
-    st.subheader("Customer Lifetime Revenue Distribution")
-    fig, ax = plt.subplots()
-    sns.histplot(revenue_per_customer, bins=30, kde=True, ax=ax)
-    st.pyplot(fig)
+    if revenue_per_customer is not None:
+        st.subheader("Customer Lifetime Revenue Distribution")
+        st.image(charts.cached_png(
+            (view, "lifetime_histogram", bins),
+            lambda: charts.lifetime_histogram(revenue_per_customer, bins),
+        ))
 
-    st.subheader("Top 10 Customers by Revenue")
-    st.dataframe(revenue_per_customer.sort_values(ascending=False).head(10))
+    st.subheader(f"Top {top_n} Customers by Revenue")
+    top = results['top_customers'].top(top_n)
+    st.dataframe(top[['revenue']] if results['top_customers'].exact else top)
+    top_k_caption(results['top_customers'], top, "customers")
 
-    # -------------------------
-       # -------------------------
-    # 📊 Pricing & Discounts 
-    # -------------------------
-    st.header("📊 Pricing & Discounts")
 
-    st.subheader("Price Distribution")
-    fig, ax = plt.subplots()
-    sns.histplot(df['price'], bins=40, kde=True, ax=ax)
-    st.pyplot(fig)
+# -------------------------
+# 📊 Pricing & Discounts
+# -------------------------
+@dashboard_section("📊 Pricing & Discounts")
+def pricing_section(results, df, view):
+    bins = st.slider("Price bins", 10, 100, 40)
+    # Without row data the charts are drawn from the streamed quantile sketches
+    if df is None:
+        pricing = results['pricing']
+        draw_prices = lambda: charts.sketch_histogram(pricing.price, bins, "price")
+        draw_discounts = lambda: charts.discount_boxplot(charts.sketch_quintile_stats(pricing))
+    else:
+        draw_prices = lambda: charts.price_histogram(df['price'], bins)
+        draw_discounts = lambda: charts.discount_boxplot(charts.discount_quintile_stats(df['discount'], df['revenue']))
 
+    st.subheader("Price Distribution")
+    st.image(charts.cached_png((view, "price_histogram", bins), draw_prices))
 
     st.subheader("Discount Impact on Revenue")
-    fig, ax = plt.subplots()
-    sns.boxplot(
-        x=pd.qcut(df['discount'], 5, duplicates='drop'),
-        y=df['revenue'],
-        ax=ax
-    )
-    ax.set_xlabel("Discount Quintiles")
-    st.pyplot(fig)
+    st.image(charts.cached_png((view, "discount_boxplot"), draw_discounts))
 
+    st.subheader("Price & Discount Percentiles")
+    st.dataframe(results['percentiles'])
+    if df is None:
+        st.caption(f"Estimated from quantile sketches (rank error about ±{2 / QUANTILE_K:.1%}).")
 
 
-    # -------------------------
-    # 🌍 Regional & Payment Analysis
-    # -------------------------
-    st.header("🌍 Regional & Payment Insights")
+# -------------------------
+# 🌍 Regional & Payment Analysis
+# -------------------------
+@dashboard_section("🌍 Regional & Payment Insights")
+def regional_section(results, df, view):
     st.subheader("Revenue by Region")
-    st.bar_chart(df.groupby("region")['revenue'].sum())
+    st.bar_chart(results['region_revenue'])
 
     st.subheader("Orders by Payment Method")
-    st.bar_chart(df['payment_method'].value_counts())
+    st.bar_chart(results['payment_counts'])
+
 
-    # -------------------------
-    # 📅 Seasonality
-    # -------------------------
-    st.header("📅 Seasonality Patterns")
+# -------------------------
+# 📅 Seasonality
+# -------------------------
+@dashboard_section("📅 Seasonality Patterns")
+def seasonality_section(results, df, view):
     st.subheader("Sales by Day of Week")
-    st.bar_chart(df['dayofweek'].value_counts())
+    st.bar_chart(label_weekdays(results['dayofweek_counts']))
 
     st.subheader("Hourly Sales Pattern")
-    hourly_sales = df.groupby('hour')['revenue'].sum()
-    st.bar_chart(hourly_sales)
+    st.bar_chart(results['hourly_sales'])
 
     st.subheader("Weekend vs Weekday Sales")
-    df['is_weekend'] = df['dayofweek'].isin(["Saturday", "Sunday"])
-    weekend_sales = df.groupby('is_weekend')['revenue'].sum()
-    st.bar_chart(weekend_sales)
-
-    # -------------------------
-    # 🔗 Correlations
-    # -------------------------
-    st.header("🔗 Correlation Heatmap")
-    fig, ax = plt.subplots()
-    sns.heatmap(df[['price','discount','quantity','revenue']].corr(),
-                annot=True, cmap="coolwarm", ax=ax)
-    st.pyplot(fig)
+    st.bar_chart(results['weekend_sales'])
+
+
+# -------------------------
+# 🔗 Correlations
+# -------------------------
+@dashboard_section("🔗 Correlation Heatmap")
+def correlation_section(results, df, view):
+    method = st.radio(
+        "Method", ["Pearson", "Spearman"], horizontal=True,
+        help="In streaming mode Spearman ranks values against quantile sketches, "
+             "which takes a second pass over the file.",
+    )
+    if method == "Pearson":
+        correlations = results['correlations']
+    elif dataset is not None:
+        st.info("Spearman correlation needs the raw rows, which saved datasets do not keep.")
+        return
+    elif df is None:
+        correlations = stream_rank_orders(
+            uploaded_file.getvalue(), results['quantiles'], int(chunk_rows), date_range, upload_key(uploaded_file),
+        )
+    else:
+        correlations = results['rank_correlations']
+    st.image(charts.cached_png(
+        (view, "correlation_heatmap", method),
+        lambda: charts.correlation_heatmap(correlations),
+    ))
+    if df is None and method == "Spearman":
+        st.caption(f"Approximate: ranks come from quantile sketches (rank error about ±{2 / QUANTILE_K:.1%}).")
+
+    with st.expander("Covariance"):
+        st.dataframe(results['covariance'])
+
+
+# -------------------------
+# 🧮 Memory Profile
+# -------------------------
+@dashboard_section("🧮 Memory Profile")
+def memory_section(results, df, view):
+    if df is None or use_polars:
+        st.info(
+            "The memory profile covers the in-memory frame; streaming, saved datasets "
+            "and the Polars backend keep only aggregates."
+        )
+        return
+    report = memory_report(df)
+    total = report['bytes'].sum()
+    col1, col2 = st.columns(2)
+    col1.metric("Frame size", f"{total / 1e6:,.1f} MB", help="Deep size of every column, including labels")
+    # Savings are recorded when a frame is downcast; date-filtered CSV frames come from the full one
+    saved, scope = LOAD_REPORTS.get((*view, "downcast")), "the loaded frame"
+    if saved is None:
+        saved, scope = LOAD_REPORTS.get((*view[:2], None, "downcast")), "the full dataset"
+    if downcast and saved is not None:
+        col2.metric("Saved by downcasting", f"{saved / 1e6:,.1f} MB", help=f"Measured on {scope}")
+    else:
+        col2.metric(
+            "Downcasting would save", f"{report['saved_bytes'].sum() / 1e6:,.1f} MB",
+            help="Turn on *Downcast columns* in the sidebar to apply the recommended dtypes",
+        )
+    sizes = ['bytes', 'recommended_bytes', 'saved_bytes']
+    st.dataframe(
+        report.assign(**{name: report[name] / 1e6 for name in sizes})
+        .rename(columns={name: name.replace("bytes", "MB") for name in sizes})
+    )
+
+
+SECTIONS = [
+    kpi_section,
+    trends_section,
+    product_section,
+    customer_section,
+    pricing_section,
+    regional_section,
+    seasonality_section,
+    correlation_section,
+    memory_section,
+]
+
+
+def upload_key(uploaded_file):
+    """The upload's content hash, computed once per file and kept in the session.
+
+    Reruns reuse it instead of hashing the whole file again.
+    """
+    file_id, key = st.session_state.get("upload_key", (None, None))
+    if file_id != uploaded_file.file_id:
+        key = content_hash(uploaded_file.getvalue())
+        st.session_state["upload_key"] = (uploaded_file.file_id, key)
+    return key
+
+
+# Upload file
+uploaded_file = None
+results = None
+dataset = None
+if saved:
+    try:
+        dataset = load_dataset(saved)
+    except ValueError as error:
+        st.error(str(error))
+if dataset is not None:
+    results = dataset.summary()
+    df = None
+    view = (dataset.name, dataset.key, "dataset")
+    # The dataset's own mode decides how its distinct counts were aggregated
+    approximate = dataset.approximate
+    st.caption(
+        f"Saved dataset **{dataset.name}**: {len(dataset.files)} files, {dataset.rows:,} rows"
+        f"{' (approximate aggregates)' if approximate else ''}. The date filter does not apply."
+    )
+else:
+    uploaded_file = st.file_uploader(
+        "Upload your E-commerce orders (CSV, Parquet or Feather)",
+        type=["csv", "parquet", "feather", "arrow"],
+    )
+
+if uploaded_file:
+    # Load data (parsed + engineered frame is cached by file content hash);
+    # measures are computed when a section first reads them and memoized per dataset view
+    view, results, df = compute_results(
+        uploaded_file.getvalue(), engine, date_range, streaming, int(chunk_rows), approximate, downcast,
+        backend if use_polars else "pandas", upload_key(uploaded_file),
+    )
+    if df is not None and not use_polars:
+        report = LOAD_REPORTS.get(view[0]) or {}
+        if "date_format" in report:
+            st.sidebar.caption(f"order_date format: `{report['date_format']}`")
+        if "typed_bytes" in report:
+            st.sidebar.caption(
+                f"Typed schema: {report['typed_bytes'] / 1e6:,.1f} MB in memory, "
+                f"~{report['inferred_bytes'] / 1e6:,.1f} MB with inferred dtypes "
+                f"({report['ratio']:.1f}x smaller)"
+            )
+
+if results is not None:
+    if results['nat_rows']:
+        st.warning(f"{results['nat_rows']:,} rows have an unparseable order_date and are missing from time-based charts.")
+
+    for render_section in SECTIONS:
+        render_section(results, df, view)
+
+st.sidebar.caption(f"⏱ Full dashboard run: {(time.perf_counter() - run_start) * 1000:,.0f} ms")
+
+if profile is not None:
+    activate(None)
+    profile.write()
+    with st.sidebar.expander("⏱ Profile of this run"):
+        st.dataframe(profile.rows(), hide_index=True)
+        st.caption(
+            f"Memory is the change in resident set size. Appended to `{PROFILE_LOG}`, "
+            "which also gets reruns of a single section."
+        )
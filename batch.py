@@ -0,0 +1,144 @@
+# batch.py
+"""Compute every dashboard aggregate for order files, without Streamlit.
+
+    python batch.py orders/*.csv --out aggregates --format parquet --jobs 4
+
+Each input gets its own ``<out>/<file stem>/`` directory holding either one
+``aggregates.json`` or one Parquet file per table. Files are written to a
+temporary name and renamed into place, so several batch runs (or workers)
+never leave half-written output behind.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from loader import DEFAULT_ENGINE, ENGINES, date_bounds
+from pipeline import BACKENDS, compute_results, dashboard_tables
+from streaming import DEFAULT_CHUNK_ROWS, stream_aggregates
+
+FORMATS = ("json", "parquet")
+
+# The process umask, read once: os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _write_atomic(path, write):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp)
+        # mkstemp creates the file 0600; give it the mode a plain open() would
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _frame(table):
+    """A Parquet-writable frame: Series become one column, labels become strings."""
+    if isinstance(table, pd.Series):
+        table = pd.to_numeric(table) if table.dtype == object else table
+        table = table.to_frame(name=table.name or "value")
+    frame = table.rename(columns=str)
+    frame.index = frame.index.astype(str)
+    return frame
+
+
+def write_tables(tables, out_dir, fmt="json"):
+    """Write ``tables`` (name -> Series/DataFrame) to ``out_dir``; return the paths written."""
+    os.makedirs(out_dir, exist_ok=True)
+    if fmt == "json":
+        document = {
+            name: json.loads(table.to_json(orient="index", date_format="iso"))
+            for name, table in tables.items()
+        }
+        path = os.path.join(out_dir, "aggregates.json")
+
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(document, f, indent=2)
+
+        _write_atomic(path, write)
+        return [path]
+    paths = []
+    for name, table in tables.items():
+        path = os.path.join(out_dir, f"{name}.parquet")
+        _write_atomic(path, lambda tmp, table=table: _frame(table).to_parquet(tmp))
+        paths.append(path)
+    return paths
+
+
+def process_file(path, out_dir, fmt="json", engine=DEFAULT_ENGINE, date_range=None, streaming=False,
+                 chunk_rows=DEFAULT_CHUNK_ROWS, approximate=False, top_n=10, backend="pandas"):
+    """Aggregate one order file and write its tables; return ``(path, seconds, paths written)``."""
+    start = time.perf_counter()
+    if streaming:
+        # Stream from the path instead of reading the file into memory first
+        results = stream_aggregates(path, chunk_rows, date_bounds(date_range), approximate).summary()
+    elif backend == "polars":
+        from polars_backend import summarize_orders
+
+        # Scanning the path lets Polars read only the needed columns and row groups
+        results = summarize_orders(path, date_bounds(date_range))[0]
+    else:
+        with open(path, "rb") as f:
+            results = compute_results(f.read(), engine, date_range, approximate=approximate)[1]
+    written = write_tables(dashboard_tables(results, top_n), out_dir, fmt)
+    return path, time.perf_counter() - start, written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="CSV, Parquet or Feather order files")
+    parser.add_argument("--out", default="aggregates", help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="json")
+    parser.add_argument("--engine", choices=list(ENGINES), default=DEFAULT_ENGINE)
+    parser.add_argument("--backend", choices=list(BACKENDS), default="pandas", help="ignored with --streaming")
+    parser.add_argument("--streaming", action="store_true", help="fold files chunk by chunk in bounded memory")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--approximate", action="store_true", help="sketch distinct counts and top-k")
+    parser.add_argument("--start", type=pd.Timestamp, help="first order date to include")
+    parser.add_argument("--end", type=pd.Timestamp, help="last order date to include")
+    parser.add_argument("--top", type=int, default=10, help="rows in the top products/customers tables")
+    parser.add_argument("--jobs", type=int, default=1, help="files processed in parallel")
+    args = parser.parse_args(argv)
+
+    if args.end is not None and args.start is None:
+        parser.error("--end requires --start")
+    date_range = [d for d in (args.start, args.end) if d is not None]
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in args.paths]
+    if len(set(stems)) != len(stems):
+        parser.error("input file names must be unique, their stems name the output directories")
+
+    options = dict(
+        fmt=args.format, engine=args.engine, date_range=date_range, streaming=args.streaming,
+        chunk_rows=args.chunk_rows, approximate=args.approximate, top_n=args.top, backend=args.backend,
+    )
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {
+            path: pool.submit(process_file, path, os.path.join(args.out, stem), **options)
+            for path, stem in zip(args.paths, stems)
+        }
+        for path, future in futures.items():
+            try:
+                _, seconds, written = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"{path}: failed: {exc}", file=sys.stderr)
+                continue
+            print(f"{path}: {len(written)} files in {os.path.dirname(written[0])} ({seconds:.2f} s)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
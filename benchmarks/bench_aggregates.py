@@ -0,0 +1,95 @@
+# bench_aggregates.py
+"""Shared-factorization aggregation engine vs independent per-section groupbys.
+
+    python benchmarks/bench_aggregates.py --rows 1000000 10000000
+
+Both paths run on the same engineered frame and their results are checked
+for equality before timings are reported. ``cold`` includes building the
+pre-aggregated cube, ``warm`` reuses a cached one as the dashboard does.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from aggregates import Cube, Summary  # noqa: E402
+from generate_orders import orders_file  # noqa: E402
+from loader import add_features, read_orders  # noqa: E402
+
+
+def summarize_groupby(df):
+    """The dashboard's original one-groupby-per-chart computation."""
+    return {
+        "total_revenue": df['revenue'].sum(),
+        "total_orders": df['order_id'].nunique(),
+        "unique_customers": df['customer_id'].nunique(),
+        "avg_order_value": df['revenue'].mean(),
+        "daily": df.groupby('day')['revenue'].sum(),
+        "monthly": df.groupby('month')['revenue'].sum(),
+        "product_revenue": df.groupby("product_id", observed=True)['revenue'].sum(),
+        "category_revenue": df.groupby("category", observed=True)['revenue'].sum(),
+        "orders_per_customer": df.groupby("customer_id", observed=True)['order_id'].nunique(),
+        "revenue_per_customer": df.groupby("customer_id", observed=True)['revenue'].sum(),
+        "region_revenue": df.groupby("region", observed=True)['revenue'].sum(),
+        "payment_counts": df['payment_method'].value_counts(),
+        "dayofweek_counts": df['dayofweek'].value_counts(),
+        "hourly_sales": df.groupby('hour')['revenue'].sum(),
+        "weekend_sales": df.groupby('is_weekend')['revenue'].sum(),
+    }
+
+
+def summarize_engine(df, names, cube=None):
+    """The engine's values for ``names`` only; the dashboard has measures with no groupby counterpart."""
+    summary = Summary(df, cube)
+    return {name: summary[name] for name in names}
+
+
+def check_equal(expected, actual):
+    for name, value in expected.items():
+        other = actual[name]
+        if isinstance(value, pd.Series):
+            value, other = (
+                series.set_axis(series.index.astype(str)).sort_index() for series in (value, other)
+            )
+            assert list(value.index) == list(other.index), name
+            assert np.allclose(value.to_numpy(float), other.to_numpy(float), rtol=1e-9, equal_nan=True), name
+        else:
+            assert np.isclose(value, other, rtol=1e-9, equal_nan=True), name
+
+
+def best_of(func, df, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--dir", default="bench_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>12} {'groupby s':>10} {'cold s':>8} {'warm s':>8} {'speedup':>8}")
+    for rows in args.rows:
+        with open(orders_file(args.dir, rows), "rb") as f:
+            df = add_features(read_orders(f.read()))
+        expected = summarize_groupby(df)
+        check_equal(expected, summarize_engine(df, expected))
+        cube = Cube.from_frame(df)
+        baseline = best_of(summarize_groupby, df, args.repeat)
+        cold = best_of(lambda frame: summarize_engine(frame, expected), df, args.repeat)
+        warm = best_of(lambda frame: summarize_engine(frame, expected, cube), df, args.repeat)
+        print(f"{rows:>12,} {baseline:>10.3f} {cold:>8.3f} {warm:>8.3f} {baseline / warm:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# bench_csv_engines.py
+"""Rows/sec of the pandas C parser vs the PyArrow engine.
+
+    python benchmarks/bench_csv_engines.py --rows 1000000 10000000 50000000
+
+Synthetic order files (see ``generate_orders.py``) are written to ``--dir``
+on first use and reused.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from generate_orders import orders_file  # noqa: E402
+from loader import ENGINES, read_orders  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument("--dir", default="bench_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>12} {'engine':>8} {'best s':>8} {'rows/sec':>14}")
+    for rows in args.rows:
+        with open(orders_file(args.dir, rows), "rb") as f:
+            data = f.read()
+        for engine in ENGINES:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                read_orders(data, engine)
+                best = min(best, time.perf_counter() - start)
+            print(f"{rows:>12,} {engine:>8} {best:>8.2f} {rows / best:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
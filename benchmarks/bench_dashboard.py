@@ -0,0 +1,173 @@
+# bench_dashboard.py
+"""End-to-end dashboard timings: load, feature engineering and every section.
+
+    python benchmarks/bench_dashboard.py --rows 100000 1000000 10000000 100000000
+    python benchmarks/bench_dashboard.py --rows 100000000 --streaming --json results.jsonl
+
+Input files come from ``generate_orders.py`` and are cached in ``--dir``.
+Each row count runs in a fresh process, so the peak RSS reported after
+each stage covers that dataset only. Peak RSS is the process high-water
+mark, so it never goes down from one stage to the next. Sections compute
+the aggregates the app reads and render its matplotlib charts with the
+app's default slider values. Streamlit itself is not involved. A size
+that runs out of memory is reported as failed and the next one still runs.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import charts  # noqa: E402
+from aggregates import (  # noqa: E402
+    Cube,
+    Summary,
+    category_share,
+    label_days,
+    label_months,
+    label_weekdays,
+    new_vs_repeat,
+)
+from generate_orders import orders_file  # noqa: E402
+from loader import DEFAULT_ENGINE, ENGINES, add_features, read_orders  # noqa: E402
+from streaming import DEFAULT_CHUNK_ROWS, stream_aggregates  # noqa: E402
+
+
+def kpi_section(results, df):
+    for name in ("total_revenue", "total_orders", "unique_customers", "avg_order_value"):
+        results[name]
+
+
+def trends_section(results, df):
+    label_days(results['daily']).rolling(1, min_periods=1).mean()
+    label_months(results['monthly'])
+
+
+def product_section(results, df):
+    results['top_products'].top(10)
+    category_share(results['category_revenue'])
+
+
+def customer_section(results, df):
+    revenue_per_customer = results.get('revenue_per_customer')
+    if revenue_per_customer is not None:
+        new_vs_repeat(results['orders_per_customer'])
+        charts.render_png(charts.lifetime_histogram(revenue_per_customer, 30))
+    label_days(results['daily_customers'])
+    label_months(results['monthly_customers'])
+    results['top_customers'].top(10)
+
+
+def pricing_section(results, df):
+    if df is None:
+        pricing = results['pricing']
+        charts.render_png(charts.sketch_histogram(pricing.price, 40, "price"))
+        charts.render_png(charts.discount_boxplot(charts.sketch_quintile_stats(pricing)))
+    else:
+        charts.render_png(charts.price_histogram(df['price'], 40))
+        charts.render_png(charts.discount_boxplot(charts.discount_quintile_stats(df['discount'], df['revenue'])))
+    results['percentiles']
+
+
+def regional_section(results, df):
+    results['region_revenue']
+    results['payment_counts']
+
+
+def seasonality_section(results, df):
+    label_weekdays(results['dayofweek_counts'])
+    results['hourly_sales']
+    results['weekend_sales']
+
+
+def correlation_section(results, df):
+    charts.render_png(charts.correlation_heatmap(results['correlations']))
+    results['covariance']
+
+
+SECTIONS = [
+    kpi_section,
+    trends_section,
+    product_section,
+    customer_section,
+    pricing_section,
+    regional_section,
+    seasonality_section,
+    correlation_section,
+]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_stages(path, engine, streaming, chunk_rows):
+    """Time each stage for one file; return ``[(stage, seconds, peak RSS MB)]``."""
+    records = []
+
+    def stage(name, func):
+        start = time.perf_counter()
+        value = func()
+        records.append((name, time.perf_counter() - start, peak_rss_mb()))
+        return value
+
+    if streaming:
+        running = stage("stream", lambda: stream_aggregates(path, chunk_rows))
+        results = stage("summary", running.summary)
+        df = None
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+        df = stage("load", lambda: read_orders(data, engine))
+        del data
+        df = stage("features", lambda: add_features(df))
+        results = Summary(df, stage("cube", lambda: Cube.from_frame(df)))
+    for section in SECTIONS:
+        stage(section.__name__, lambda: section(results, df))
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000, 100_000_000])
+    parser.add_argument("--dir", default="bench_data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=list(ENGINES), default=DEFAULT_ENGINE)
+    parser.add_argument("--streaming", action="store_true", help="time the chunked path instead of a full frame")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--json", help="append one JSON record per stage to this file")
+    args = parser.parse_args(argv)
+
+    mode = "streaming" if args.streaming else args.engine
+    print(f"{'rows':>12} {'mode':>9} {'stage':>20} {'wall s':>8} {'peak RSS MB':>12}")
+    for rows in args.rows:
+        path = orders_file(args.dir, rows, args.seed)
+        # A fresh spawned process per size: its RSS high-water mark starts from scratch
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                records = pool.submit(run_stages, path, args.engine, args.streaming, args.chunk_rows).result()
+            except BrokenProcessPool:
+                print(f"{rows:>12,} {mode:>9} {'failed (killed, out of memory?)':>42}")
+                continue
+        for name, seconds, peak in records:
+            print(f"{rows:>12,} {mode:>9} {name:>20} {seconds:>8.3f} {peak:>12,.0f}")
+        total = sum(seconds for _, seconds, _ in records)
+        print(f"{rows:>12,} {mode:>9} {'total':>20} {total:>8.3f} {records[-1][2]:>12,.0f}")
+        if args.json:
+            with open(args.json, "a") as f:
+                for name, seconds, peak in records:
+                    record = {"rows": rows, "mode": mode, "stage": name, "seconds": seconds, "peak_rss_mb": peak}
+                    f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# bench_polars.py
+"""Polars lazy backend vs the pandas path, from file to every dashboard result.
+
+    python benchmarks/bench_polars.py --rows 1000000 10000000
+
+For each size the CSV from ``generate_orders.py`` and a Parquet copy are
+run through both backends, without and with a date filter (the first
+quarter, which Polars pushes into the Parquet scan). Every result is
+checked against the pandas one before timings are reported. The generated
+files are clean; ``tests/test_polars_backend.py`` covers messy input.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from aggregates import RESULTS, Summary  # noqa: E402
+from bench_aggregates import check_equal  # noqa: E402
+from generate_orders import START, orders_file  # noqa: E402
+from loader import DEFAULT_ENGINE, add_features, filter_dates, read_orders  # noqa: E402
+from polars_backend import summarize_orders  # noqa: E402
+
+# Internal state with no Polars counterpart; its correlations/covariance are compared
+SKIPPED = {"moments"}
+
+FILTER = (START, START + pd.DateOffset(months=3))
+
+
+def summarize_pandas(path, bounds, engine=DEFAULT_ENGINE):
+    with open(path, "rb") as f:
+        df = filter_dates(add_features(read_orders(f.read(), engine, bounds=bounds)), bounds)
+    summary = Summary(df)
+    return {name: summary[name] for name in RESULTS if name not in SKIPPED}
+
+
+def summarize_polars(path, bounds):
+    return summarize_orders(path, bounds)[0]
+
+
+def check_parity(expected, actual):
+    scalars_and_series = {}
+    for name, value in expected.items():
+        other = actual[name]
+        if isinstance(value, pd.DataFrame):
+            assert list(value.index) == list(other.index) and list(value.columns) == list(other.columns), name
+            assert np.allclose(value.to_numpy(float), other.to_numpy(float), rtol=1e-9, equal_nan=True), name
+        elif hasattr(value, "top"):
+            pd.testing.assert_frame_equal(value.top(20), other.top(20), rtol=1e-9, check_index_type=False)
+        else:
+            scalars_and_series[name] = value
+    check_equal(scalars_and_series, actual)
+
+
+def parquet_copy(csv_path):
+    """Parquet version of a generated CSV with 100k-row groups, written on first use."""
+    path = csv_path[:-len(".csv")] + ".parquet"
+    if not os.path.exists(path):
+        import pyarrow.csv as pacsv
+        import pyarrow.parquet as pq
+
+        table = pacsv.read_csv(csv_path)
+        pq.write_table(table, path + ".tmp", row_group_size=100_000)
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--dir", default="bench_data")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>12} {'input':>8} {'filter':>7} {'pandas s':>9} {'polars s':>9} {'speedup':>8}")
+    for rows in args.rows:
+        csv_path = orders_file(args.dir, rows)
+        for path in (csv_path, parquet_copy(csv_path)):
+            for bounds in (None, FILTER):
+                check_parity(summarize_pandas(path, bounds), summarize_polars(path, bounds))
+                pandas_s = best_of(lambda: summarize_pandas(path, bounds), args.repeat)
+                polars_s = best_of(lambda: summarize_polars(path, bounds), args.repeat)
+                print(
+                    f"{rows:>12,} {os.path.splitext(path)[1][1:]:>8} {'Q1' if bounds else '-':>7} "
+                    f"{pandas_s:>9.3f} {polars_s:>9.3f} {pandas_s / polars_s:>7.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# generate_orders.py
+"""Reproducible synthetic order-line CSVs with realistic skew.
+
+    python benchmarks/generate_orders.py --rows 10000000 --out bench_data/orders.csv
+
+Products and customers are drawn from Zipf distributions, so a few of them
+carry most of the revenue. Orders hold one or more lines that share a
+customer, timestamp and payment method. Dates follow a yearly season with
+a November/December peak, busier weekends and a daytime profile. Discounts
+are mostly zero with a tail of promotions. Each product keeps its category
+and list price, and each customer keeps a home region. The same ``seed``
+always writes the same file. Rows are generated and written in chunks, so
+memory stays flat at any size.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Bump when the generated data changes, so cached benchmark files are regenerated
+GENERATOR_VERSION = 1
+
+START = pd.Timestamp("2023-01-01")
+DAYS = 730
+
+CATEGORIES = ["Electronics", "Home", "Books", "Toys", "Garden", "Beauty", "Sports", "Grocery"]
+CATEGORY_WEIGHTS = [0.22, 0.18, 0.14, 0.12, 0.1, 0.1, 0.08, 0.06]
+REGIONS = ["North", "South", "East", "West"]
+REGION_WEIGHTS = [0.35, 0.25, 0.22, 0.18]
+PAYMENT_METHODS = ["card", "paypal", "cod", "gift_card"]
+PAYMENT_WEIGHTS = [0.6, 0.25, 0.1, 0.05]
+DISCOUNTS = [0, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5]
+DISCOUNT_WEIGHTS = [0.55, 0.12, 0.12, 0.08, 0.07, 0.04, 0.02]
+
+# Orders per hour of day, relative
+HOUR_WEIGHTS = [1, 0.6, 0.4, 0.3, 0.3, 0.4, 0.8, 1.5, 2.5, 3, 3.2, 3.4,
+                3.8, 3.6, 3.2, 3, 3.1, 3.4, 4, 4.5, 4.6, 4, 3, 1.8]
+
+
+def _normalize(weights):
+    weights = np.asarray(weights, dtype="float64")
+    return weights / weights.sum()
+
+
+def zipf_cdf(n, exponent):
+    """Cumulative probabilities of ranks ``0..n-1`` under a Zipf law."""
+    return np.cumsum(_normalize(1.0 / np.arange(1, n + 1) ** exponent))
+
+
+def day_weights():
+    """Relative order volume per day over ``DAYS`` days from ``START``."""
+    dates = pd.date_range(START, periods=DAYS, freq="D")
+    season = 1 + 0.25 * np.sin(2 * np.pi * (dates.dayofyear.to_numpy() - 100) / 365.25)
+    peak = np.where(dates.month == 11, 1.6, np.where(dates.month == 12, 1.9, 1.0))
+    weekend = np.where(dates.dayofweek >= 5, 1.3, 1.0)
+    growth = np.linspace(1, 1.4, DAYS)
+    return _normalize(season * peak * weekend * growth)
+
+
+class OrderGenerator:
+    """Draws order lines for catalogs sized to ``rows``."""
+
+    def __init__(self, rows, seed=0, products=None, customers=None, exponent=1.1):
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+        self.products = products or int(np.clip(rows // 200, 1_000, 200_000))
+        self.customers = customers or max(rows // 10, 100)
+        self.product_cdf = zipf_cdf(self.products, exponent)
+        self.customer_cdf = zipf_cdf(self.customers, 0.8)
+        # Popularity rank is not the id, so P1 is not always the best seller
+        self.product_ids = rng.permutation(self.products)
+        self.customer_ids = rng.permutation(self.customers)
+        self.category = rng.choice(len(CATEGORIES), self.products, p=_normalize(CATEGORY_WEIGHTS))
+        self.list_price = np.round(np.floor(rng.lognormal(3.5, 0.9, self.products)) + 0.99, 2)
+        self.region = rng.choice(len(REGIONS), self.customers, p=_normalize(REGION_WEIGHTS))
+        self.day_cdf = np.cumsum(day_weights())
+        self.hour_cdf = np.cumsum(_normalize(HOUR_WEIGHTS))
+        self.next_order = 1
+
+    def _draw(self, cdf, size):
+        return np.minimum(np.searchsorted(cdf, self.rng.random(size)), len(cdf) - 1)
+
+    def chunk(self, rows):
+        """The next ``rows`` order lines as a frame in the app's input layout."""
+        rng = self.rng
+        # Lines per order: 1 + geometric, about 1.7 on average
+        lines = rng.geometric(0.6, rows)
+        lines = lines[:np.searchsorted(np.cumsum(lines), rows) + 1]
+        orders = len(lines)
+        order_ids = np.arange(self.next_order, self.next_order + orders)
+        self.next_order += orders
+
+        customer = self.customer_ids[self._draw(self.customer_cdf, orders)]
+        seconds = (
+            self._draw(self.day_cdf, orders) * 86400
+            + self._draw(self.hour_cdf, orders) * 3600
+            + rng.integers(0, 3600, orders)
+        )
+        payment = rng.choice(len(PAYMENT_METHODS), orders, p=_normalize(PAYMENT_WEIGHTS))
+
+        per_line = np.repeat(np.arange(orders), lines)[:rows]
+        rank = self._draw(self.product_cdf, rows)
+        product = self.product_ids[rank]
+        customer = customer[per_line]
+        dates = START + pd.to_timedelta(seconds[per_line], unit="s")
+        return pd.DataFrame({
+            "order_id": order_ids[per_line],
+            "customer_id": np.char.add("C", customer.astype(str)),
+            "product_id": np.char.add("P", product.astype(str)),
+            "category": np.asarray(CATEGORIES)[self.category[product]],
+            "region": np.asarray(REGIONS)[self.region[customer]],
+            "payment_method": np.asarray(PAYMENT_METHODS)[payment[per_line]],
+            "order_date": dates.strftime("%Y-%m-%d %H:%M:%S"),
+            "quantity": 1 + rng.poisson(0.4, rows),
+            "price": self.list_price[product],
+            "discount": rng.choice(DISCOUNTS, rows, p=_normalize(DISCOUNT_WEIGHTS)),
+        })
+
+
+def write_orders(path, rows, seed=0, chunk_rows=1_000_000):
+    """Write ``rows`` synthetic order lines to the CSV ``path`` atomically."""
+    generator = OrderGenerator(rows, seed)
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", newline="") as f:
+            for start in range(0, rows, chunk_rows):
+                chunk = generator.chunk(min(chunk_rows, rows - start))
+                chunk.to_csv(f, index=False, header=start == 0)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def orders_file(directory, rows, seed=0):
+    """Path of the cached synthetic file for ``rows``, generated on first use."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"orders_{rows}_s{seed}_v{GENERATOR_VERSION}.csv")
+    if not os.path.exists(path):
+        write_orders(path, rows, seed)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--out", default="bench_data/orders.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    write_orders(args.out, args.rows, args.seed)
+    print(f"wrote {args.rows:,} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
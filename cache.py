@@ -0,0 +1,140 @@
+# cache.py
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and total size in bytes."""
+
+    def __init__(self, max_entries=4, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self._items = OrderedDict()
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._items:
+                self._remove(key)
+            # Values bigger than the whole budget are never cached
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self._items[key] = value
+            self._sizes[key] = size
+            self.total_bytes += size
+            while len(self._items) > self.max_entries or (
+                self.max_bytes is not None and self.total_bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._items)))
+
+    def _remove(self, key):
+        del self._items[key]
+        self.total_bytes -= self._sizes.pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class DiskCache:
+    """Directory of files keyed by string, bounded by total size with LRU eviction.
+
+    Reads bump the file's mtime, eviction removes the least recently used
+    files first. Entries are written to a temporary name and renamed into
+    place, so concurrent processes never see a partial file.
+    """
+
+    def __init__(self, directory, max_bytes, suffix=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def get(self, key):
+        """Return the path of a cached entry, or None."""
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, write):
+        """Store an entry by calling ``write(path)`` and return its final path."""
+        if not self.enabled:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=self.suffix)
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+        return path
+
+    def entries(self):
+        """``(mtime, size, path)`` for every committed entry, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith(".tmp-") and entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(found)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Already evicted by another process, or still open on Windows
+                continue
+            total -= size
@@ -0,0 +1,206 @@
+# charts.py
+import io
+import os
+
+import numpy as np
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from cache import LRUCache
+from density import binned_kde
+
+# Rendered chart images kept in memory, keyed by dataset view + chart parameters
+FIGURE_CACHE_MB = int(os.environ.get("EDA_FIGURE_CACHE_MB", 64))
+
+FIGURE_CACHE = LRUCache(
+    max_entries=256,
+    max_bytes=FIGURE_CACHE_MB * 1024 * 1024,
+    sizeof=len,
+)
+
+
+def render_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def cached_png(key, draw):
+    """PNG bytes for ``key``, calling ``draw()`` for a Figure only on a cache miss.
+
+    ``key`` must identify the data and every parameter that changes the
+    picture, e.g. ``(dataset view, chart name, bins)``.
+    """
+    png = FIGURE_CACHE.get(key)
+    if png is None:
+        png = render_png(draw())
+        FIGURE_CACHE.put(key, png)
+    return png
+
+
+# Figures are built without pyplot so concurrent sessions don't share state
+
+def histogram_with_kde(ax, values, bins, label=None, weights=None, value_range=None):
+    """Count histogram with a KDE overlay, like ``sns.histplot(kde=True)``.
+
+    Bin counts come from one ``np.histogram`` pass and the curve from the
+    binned FFT estimator, so the cost stays linear in the number of values.
+    ``weights`` and ``value_range`` draw a quantile sketch's retained items
+    (see ``sketches.KLL.items``) instead of the raw values.
+    """
+    values = np.asarray(values, dtype="float64")
+    finite = np.isfinite(values)
+    values = values[finite]
+    if weights is not None:
+        weights = np.asarray(weights, dtype="float64")[finite]
+    counts, edges = np.histogram(values, bins=bins, range=value_range, weights=weights)
+    color = sns.color_palette()[0]
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge",
+           color=color, alpha=0.5, edgecolor="black", linewidth=0.75)
+    support, density = binned_kde(values, weights)
+    if len(support):
+        total = len(values) if weights is None else weights.sum()
+        ax.plot(support, density * total * np.diff(edges).mean(), color=color)
+    ax.set_xlabel(label or "")
+    ax.set_ylabel("Count")
+
+
+def lifetime_histogram(revenue_per_customer, bins):
+    fig = Figure()
+    ax = fig.subplots()
+    histogram_with_kde(ax, revenue_per_customer, bins, label=revenue_per_customer.name)
+    return fig
+
+
+def price_histogram(price, bins):
+    fig = Figure()
+    ax = fig.subplots()
+    histogram_with_kde(ax, price, bins, label=price.name)
+    return fig
+
+
+def sketch_histogram(sketch, bins, label):
+    """``price_histogram`` drawn from a ``sketches.KLL`` instead of the column."""
+    fig = Figure()
+    ax = fig.subplots()
+    values, weights = sketch.items()
+    histogram_with_kde(ax, values, bins, label=label, weights=weights,
+                       value_range=(sketch.min, sketch.max) if sketch.n else None)
+    return fig
+
+
+# Outliers drawn per box; the rest are thinned out evenly across the range
+MAX_OUTLIERS = 200
+
+
+def quantile_bins(values, edges):
+    """Bin index per value for right-closed ``edges`` like ``pd.qcut`` (-1 for NaN)."""
+    bins = np.clip(np.searchsorted(edges, values, side="left") - 1, 0, len(edges) - 2)
+    return np.where(np.isnan(values), -1, bins)
+
+
+def interval_labels(edges):
+    return [
+        f"{'[' if i == 0 else '('}{lo:.3g}, {hi:.3g}]"
+        for i, (lo, hi) in enumerate(zip(edges[:-1], edges[1:]))
+    ]
+
+
+def boxplot_stats(groups, values, labels, max_outliers=MAX_OUTLIERS):
+    """Per-group box statistics for ``Axes.bxp`` from one sort of the rows.
+
+    Quartiles use linear interpolation like ``np.percentile``, whiskers
+    reach the furthest values within 1.5 IQR, and at most ``max_outliers``
+    outliers are kept per group (evenly spaced, extremes included).
+    """
+    keep = (groups >= 0) & ~np.isnan(values)
+    groups, values = groups[keep], values[keep]
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    starts = np.searchsorted(groups, np.arange(len(labels)), side="left")
+    ends = np.searchsorted(groups, np.arange(len(labels)), side="right")
+    stats = []
+    for label, start, end in zip(labels, starts, ends):
+        box = values[start:end]
+        if len(box) == 0:
+            continue
+        q1, med, q3 = np.percentile(box, [25, 50, 75])
+        iqr = q3 - q1
+        low = box[np.searchsorted(box, q1 - 1.5 * iqr, side="left")]
+        high = box[np.searchsorted(box, q3 + 1.5 * iqr, side="right") - 1]
+        fliers = np.concatenate([box[box < low], box[box > high]])
+        if len(fliers) > max_outliers:
+            fliers = np.sort(fliers)[np.linspace(0, len(fliers) - 1, max_outliers).astype("int64")]
+        stats.append({"label": label, "q1": q1, "med": med, "q3": q3,
+                      "whislo": low, "whishi": high, "fliers": fliers})
+    return stats
+
+
+def discount_quintile_stats(discount, revenue, edges=None):
+    """Revenue box statistics per discount quintile.
+
+    ``edges`` are the quintile boundaries; they are computed exactly from
+    ``discount`` when not given. Duplicate edges are dropped like
+    ``pd.qcut(..., duplicates='drop')``.
+    """
+    discount = np.asarray(discount, dtype="float64")
+    revenue = np.asarray(revenue, dtype="float64")
+    if edges is None:
+        edges = np.nanquantile(discount, np.linspace(0, 1, 6))
+    edges = np.unique(edges)
+    if len(edges) < 2:
+        edges = np.array([edges[0], edges[0]]) if len(edges) else np.array([0.0, 0.0])
+    return boxplot_stats(quantile_bins(discount, edges), revenue, interval_labels(edges))
+
+
+def sketch_box_stats(sketch, label, max_outliers=MAX_OUTLIERS):
+    """``boxplot_stats`` entry for one ``sketches.KLL``: quartiles from the
+    sketch, whiskers and outliers from its retained items plus exact extremes."""
+    q1, med, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    values = np.unique(np.append(sketch.items()[0], [sketch.min, sketch.max]))
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+    fliers = values[~inside]
+    if len(fliers) > max_outliers:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, max_outliers).astype("int64")]
+    return {"label": label, "q1": q1, "med": med, "q3": q3,
+            "whislo": values[inside].min(), "whishi": values[inside].max(), "fliers": fliers}
+
+
+def sketch_quintile_stats(pricing):
+    """``discount_quintile_stats`` from ``aggregates.PricingSketches``.
+
+    Quintile edges come from the discount level counts; each box merges the
+    revenue sketches of the discount levels that fall in its quintile.
+    """
+    edges = np.unique(pricing.discount_quantiles(np.linspace(0, 1, 6)))
+    if len(edges) < 2:
+        edges = np.array([edges[0], edges[0]]) if len(edges) else np.array([0.0, 0.0])
+    levels = np.array(sorted(pricing.revenue), dtype="float64")
+    bins = quantile_bins(levels, edges)
+    stats = []
+    for i, label in enumerate(interval_labels(edges)):
+        sketch = pricing.revenue_between(levels[bins == i])
+        if sketch.n:
+            stats.append(sketch_box_stats(sketch, label))
+    return stats
+
+
+def discount_boxplot(stats):
+    fig = Figure()
+    ax = fig.subplots()
+    colors = sns.color_palette()
+    boxes = ax.bxp(stats, patch_artist=True, widths=0.8,
+                   medianprops={"color": "black"}, flierprops={"markersize": 3, "alpha": 0.5})
+    for patch, color in zip(boxes["boxes"], colors):
+        patch.set_facecolor(color)
+    ax.set_xlabel("Discount Quintiles")
+    ax.set_ylabel("revenue")
+    return fig
+
+
+def correlation_heatmap(correlations):
+    fig = Figure()
+    ax = fig.subplots()
+    sns.heatmap(correlations, annot=True, cmap="coolwarm", ax=ax)
+    return fig
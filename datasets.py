@@ -0,0 +1,180 @@
+# datasets.py
+"""Saved datasets that grow by appending order files.
+
+A dataset keeps only the running aggregates of every file appended to it
+(see ``streaming.RunningAggregates``), never the rows, so appending a file
+costs one streaming pass over that file plus merging its partial state
+into the saved one. Each file is recorded by content hash and appending
+the same file twice is a no-op. Appends hold a file lock on the dataset,
+so concurrent sessions or processes appending to it never lose a file.
+"""
+import contextlib
+import io
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+from cache import LRUCache
+from loader import DISK_CACHE_DIR, content_hash
+from streaming import DEFAULT_CHUNK_ROWS, SUMMARY_CACHE, stream_aggregates
+
+DATASET_DIR = os.environ.get("EDA_DATASET_DIR", os.path.join(DISK_CACHE_DIR, "datasets"))
+
+# Bump when the pickled RunningAggregates layout changes; older files are not loaded
+DATASET_VERSION = 2
+
+DATASET_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+# Loaded datasets keyed by (name, file mtime), so a rerun does not unpickle again
+DATASETS = LRUCache(max_entries=4)
+
+
+class Dataset:
+    """Running aggregates of the files appended so far, in append order."""
+
+    def __init__(self, name, approximate=False):
+        self.name = name
+        self.files = []
+        self.running = None
+        self.approximate = approximate
+
+    @property
+    def key(self):
+        """Identifies the dataset's current content, e.g. for cache keys."""
+        return content_hash("".join(f["key"] for f in self.files).encode())
+
+    @property
+    def rows(self):
+        return sum(f["rows"] for f in self.files)
+
+    def append(self, data, filename=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Fold one order file into the dataset; return False if it was already appended."""
+        key = content_hash(data)
+        if any(f["key"] == key for f in self.files):
+            return False
+        # Later files are parsed with the first file's date format, not one detected per file
+        date_format = None if self.running is None else self.running.date_format
+        delta = stream_aggregates(io.BytesIO(data), chunk_rows, approximate=self.approximate, date_format=date_format)
+        self.running = delta if self.running is None else self.running.merge(delta)
+        self.files.append({"key": key, "name": filename, "rows": delta.rows})
+        return True
+
+    def summary(self):
+        """The dashboard result dict, cached per dataset content."""
+        results = SUMMARY_CACHE.get(("dataset", self.name, self.key))
+        if results is None:
+            results = self.running.summary()
+            SUMMARY_CACHE.put(("dataset", self.name, self.key), results)
+        return results
+
+
+def dataset_path(name):
+    if not DATASET_NAME.match(name):
+        raise ValueError(f"invalid dataset name {name!r}: use letters, digits, '.', '_' or '-'")
+    return os.path.join(DATASET_DIR, f"{name}.pkl")
+
+
+def dataset_names():
+    if not os.path.isdir(DATASET_DIR):
+        return []
+    return sorted(entry[:-len(".pkl")] for entry in os.listdir(DATASET_DIR) if entry.endswith(".pkl"))
+
+
+def _read_dataset(name, path):
+    try:
+        with open(path, "rb") as f:
+            version, dataset = pickle.load(f)
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, TypeError, ValueError) as error:
+        raise ValueError(f"dataset {name!r} cannot be read ({error}); re-create it") from error
+    if version != DATASET_VERSION:
+        raise ValueError(f"dataset {name!r} was saved by an incompatible version; re-create it")
+    return dataset
+
+
+def load_dataset(name):
+    """The saved dataset ``name``, or None if it does not exist.
+
+    Raises ValueError when the file is unreadable or from another version.
+    The returned object is shared between sessions and must not be modified.
+    """
+    path = dataset_path(name)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    dataset = DATASETS.get((name, mtime))
+    if dataset is None:
+        dataset = _read_dataset(name, path)
+        DATASETS.put((name, mtime), dataset)
+    return dataset
+
+
+if sys.platform == "win32":
+    import msvcrt
+
+    def _lock(f):
+        # LK_LOCK gives up after about 10 seconds; keep waiting like flock does
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock(f):
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+    def _unlock(f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def dataset_lock(name):
+    """Hold an exclusive lock on dataset ``name``, across threads and processes."""
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    with open(os.path.join(DATASET_DIR, f"{name}.lock"), "a") as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+def save_dataset(dataset):
+    """Write atomically, so readers never see a partially written dataset."""
+    os.makedirs(DATASET_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=DATASET_DIR, prefix=".tmp-", suffix=".pkl")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((DATASET_VERSION, dataset), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, dataset_path(dataset.name))
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def append_orders(name, data, filename=None, chunk_rows=DEFAULT_CHUNK_ROWS, approximate=False):
+    """Append one order file to dataset ``name``, creating it if needed.
+
+    A new dataset uses exact or ``approximate`` aggregates; an existing
+    one keeps the mode it was created with. Returns ``(dataset, appended)``.
+    The load, merge and save run under ``dataset_lock``, reading the file
+    afresh rather than the shared cached copy.
+    """
+    path = dataset_path(name)
+    with dataset_lock(name):
+        dataset = _read_dataset(name, path) if os.path.exists(path) else Dataset(name, approximate)
+        appended = dataset.append(data, filename, chunk_rows)
+        if appended:
+            save_dataset(dataset)
+    return dataset, appended
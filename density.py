@@ -0,0 +1,80 @@
+# density.py
+"""Binned Gaussian kernel density estimation.
+
+The sample is linearly binned onto a regular grid and the grid counts are
+convolved with the Gaussian kernel through an FFT, so the cost is
+O(n + grid log grid) instead of the O(n x grid) of evaluating every point.
+
+Accuracy: the grid step is kept at most 1/8 of the bandwidth, which keeps
+the curve within 0.5% of its peak height of the exact
+``scipy.stats.gaussian_kde`` curve seaborn draws with the same (Scott)
+bandwidth. This holds while the data range spans fewer than
+``MAX_GRID / STEPS_PER_BANDWIDTH`` bandwidths; beyond that the grid is
+capped and the step grows with the range.
+"""
+import numpy as np
+
+# Grid points per bandwidth; linear-binning error shrinks with the square of the step
+STEPS_PER_BANDWIDTH = 8
+MIN_GRID = 512
+MAX_GRID = 2 ** 16
+
+# Points seaborn evaluates its KDE at
+SUPPORT_POINTS = 200
+
+
+def scott_bandwidth(values, weights=None):
+    """Scott's rule bandwidth as used by ``scipy.stats.gaussian_kde``."""
+    if weights is None:
+        return values.std(ddof=1) * len(values) ** (-1 / 5)
+    weights = weights / weights.sum()
+    mean = np.sum(weights * values)
+    variance = np.sum(weights * (values - mean) ** 2) / (1 - np.sum(weights ** 2))
+    neff = 1 / np.sum(weights ** 2)
+    return np.sqrt(variance) * neff ** (-1 / 5)
+
+
+def linear_binning(values, lo, delta, gridsize, weights=None):
+    """Spread each value's weight over its two neighbouring grid points."""
+    position = (values - lo) / delta
+    left = np.clip(np.floor(position).astype("int64"), 0, gridsize - 2)
+    right_share = np.clip(position - left, 0.0, 1.0)
+    if weights is None:
+        weights = np.ones_like(values)
+    counts = np.bincount(left, weights=weights * (1 - right_share), minlength=gridsize)
+    counts += np.bincount(left + 1, weights=weights * right_share, minlength=gridsize)
+    return counts
+
+
+def convolve_gaussian(counts, delta, bandwidth):
+    """Convolve grid counts with a Gaussian kernel of ``bandwidth`` via FFT."""
+    gridsize = len(counts)
+    offsets = np.arange(-(gridsize - 1), gridsize) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(3 * gridsize - 2)))
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    return np.maximum(smoothed[gridsize - 1:2 * gridsize - 1], 0.0)
+
+
+def binned_kde(values, weights=None, bw_adjust=1.0, cut=0.0, support_points=SUPPORT_POINTS):
+    """Gaussian KDE of ``values``, returned as ``(support, density)``.
+
+    Matches seaborn's ``histplot(kde=True)`` defaults: Scott bandwidth and a
+    support spanning the data range (``cut`` bandwidths beyond it).
+    """
+    values = np.asarray(values, dtype="float64")
+    finite = np.isfinite(values)
+    values = values[finite]
+    if weights is not None:
+        weights = np.asarray(weights, dtype="float64")[finite]
+    if len(values) < 2 or values.min() == values.max():
+        return np.array([]), np.array([])
+    bandwidth = scott_bandwidth(values, weights) * bw_adjust
+    lo, hi = values.min() - cut * bandwidth, values.max() + cut * bandwidth
+    gridsize = int(np.clip(np.ceil((hi - lo) / bandwidth * STEPS_PER_BANDWIDTH) + 1, MIN_GRID, MAX_GRID))
+    grid = np.linspace(lo, hi, gridsize)
+    delta = grid[1] - grid[0]
+    counts = linear_binning(values, lo, delta, gridsize, weights)
+    density = convolve_gaussian(counts, delta, bandwidth) / counts.sum()
+    support = np.linspace(lo, hi, support_points)
+    return support, np.interp(support, grid, density)
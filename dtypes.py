@@ -0,0 +1,139 @@
+# dtypes.py
+"""Per-column memory report and lossless dtype downcasting.
+
+Every recommendation is checked against the column's values, so applying
+it never changes what the column holds:
+
+- integers shrink to the narrowest width that fits their range, staying
+  numpy, nullable or Arrow-backed;
+- float64 becomes float32 only when every value survives the round trip;
+- strings with few distinct values become categoricals;
+- categoricals of integer ids (``"1042"``) become integers when that is
+  smaller than codes plus the category labels.
+
+A recommendation is only kept if it actually uses fewer bytes.
+"""
+import numpy as np
+import pandas as pd
+
+INT_WIDTHS = [np.int8, np.int16, np.int32, np.int64]
+
+# Strings become categoricals when at most this share of values is distinct
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _nbytes(series):
+    return int(series.memory_usage(index=False, deep=True))
+
+
+def _int_dtype(dtype, width):
+    """``width`` (a numpy integer type) in the same family as ``dtype``."""
+    if isinstance(dtype, pd.ArrowDtype):
+        import pyarrow as pa
+
+        return pd.ArrowDtype(pa.from_numpy_dtype(width))
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return pd.api.types.pandas_dtype(np.dtype(width).name.capitalize())
+    return np.dtype(width)
+
+
+def _narrowest_int(values, dtype):
+    lo, hi = values.min(), values.max()
+    if pd.isna(lo):
+        return _int_dtype(dtype, INT_WIDTHS[0])
+    for width in INT_WIDTHS:
+        info = np.iinfo(width)
+        if info.min <= lo and hi <= info.max:
+            return _int_dtype(dtype, width)
+    return dtype
+
+
+def _integer_labels(categories):
+    """Categories as integers if every label is a canonical integer string, else None."""
+    if categories.dtype.kind in "iu":
+        return categories
+    labels = pd.Series(categories.astype(str))
+    if not labels.str.fullmatch(r"-?(0|[1-9][0-9]{0,17})").all():
+        return None
+    return labels.astype("int64")
+
+
+def _candidate(series):
+    """A lossless converted copy of ``series`` worth trying, or None."""
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return None
+    if pd.api.types.is_integer_dtype(dtype):
+        target = _narrowest_int(series, dtype)
+        return None if target == dtype else series.astype(target)
+    if pd.api.types.is_float_dtype(dtype):
+        if np.dtype(getattr(dtype, "numpy_dtype", dtype)).itemsize <= 4:
+            return None
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        if not np.array_equal(values.astype("float32").astype("float64"), values, equal_nan=True):
+            return None
+        if isinstance(dtype, pd.ArrowDtype):
+            import pyarrow as pa
+
+            return series.astype(pd.ArrowDtype(pa.float32()))
+        return series.astype(pd.Float32Dtype() if isinstance(dtype, pd.Float64Dtype) else "float32")
+    if isinstance(dtype, pd.CategoricalDtype):
+        labels = _integer_labels(dtype.categories)
+        if labels is None:
+            return None
+        codes = series.cat.codes.to_numpy()
+        values = labels.to_numpy()[codes]
+        if (codes < 0).any():
+            values = pd.array(values, dtype="Int64")
+            values[codes < 0] = pd.NA
+            values = pd.Series(values, index=series.index)
+            return values.astype(_narrowest_int(values, values.dtype))
+        values = pd.Series(values, index=series.index)
+        return values.astype(_narrowest_int(values, values.dtype))
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if series.nunique() > CATEGORY_MAX_RATIO * len(series):
+            return None
+        return series.astype("category")
+    return None
+
+
+def recommend(series):
+    """The recommended converted copy of ``series``, or None to keep it as is."""
+    converted = _candidate(series)
+    if converted is None or _nbytes(converted) >= _nbytes(series):
+        return None
+    return converted
+
+
+def memory_report(df):
+    """One row per column: dtype, deep bytes, distinct values and the recommendation.
+
+    ``recommended_bytes`` equals ``bytes`` for columns that are already optimal.
+    """
+    rows = {}
+    for column, series in df.items():
+        converted = recommend(series)
+        size = _nbytes(series)
+        rows[column] = {
+            "dtype": str(series.dtype),
+            "bytes": size,
+            "distinct": int(series.nunique()),
+            "recommended": str(converted.dtype) if converted is not None else str(series.dtype),
+            "recommended_bytes": _nbytes(converted) if converted is not None else size,
+        }
+    report = pd.DataFrame.from_dict(rows, orient="index")
+    report["saved_bytes"] = report["bytes"] - report["recommended_bytes"]
+    return report
+
+
+def downcast(df):
+    """Return ``(frame, saved_bytes)`` with every recommended dtype applied.
+
+    ``df`` itself is not modified; unchanged columns are shared with it.
+    """
+    converted = {column: recommend(series) for column, series in df.items()}
+    converted = {column: series for column, series in converted.items() if series is not None}
+    if not converted:
+        return df, 0
+    saved = sum(_nbytes(df[column]) - _nbytes(series) for column, series in converted.items())
+    return df.assign(**converted), saved
@@ -0,0 +1,104 @@
+# pipeline.py
+"""The dashboard's data path without any Streamlit calls.
+
+``app.py`` and the ``batch.py`` command line both go through
+``compute_results``, so a nightly job gets exactly the numbers the UI shows.
+"""
+import importlib.util
+
+import pandas as pd
+
+from aggregates import (
+    Summary,
+    cached_cube,
+    cached_distinct,
+    category_share,
+    label_days,
+    label_months,
+    label_weekdays,
+    new_vs_repeat,
+    summary_store,
+)
+from loader import DEFAULT_ENGINE, date_bounds, load_orders
+from streaming import DEFAULT_CHUNK_ROWS, stream_orders
+
+# Execution backends for in-memory analysis; Polars is optional
+BACKENDS = {
+    "pandas": "pandas (shared-factorization engine)",
+    "polars": "Polars (lazy query plan, multi-threaded)",
+}
+
+
+def available_backends():
+    return [name for name in BACKENDS if name == "pandas" or importlib.util.find_spec(name) is not None]
+
+
+def compute_results(data, engine=DEFAULT_ENGINE, date_range=None, streaming=False,
+                    chunk_rows=DEFAULT_CHUNK_ROWS, approximate=False, downcast=False, backend="pandas",
+                    key=None):
+    """Return ``(view, results, df)`` for raw file bytes.
+
+    ``results`` maps result names to aggregates (lazily computed in memory,
+    precomputed when streaming or with the Polars ``backend``), ``df`` is
+    the engineered frame (only the pricing columns with Polars) or None when
+    streaming, and ``view`` identifies the dataset view for cache keys.
+    ``downcast`` only changes dtypes (see ``dtypes.downcast``), not results.
+    ``key`` is the file's ``content_hash`` if already known.
+    """
+    if streaming:
+        key, results = stream_orders(data, chunk_rows, date_range, approximate, key)
+        return (key, "streaming", date_bounds(date_range)), results, None
+    if backend == "polars":
+        from polars_backend import polars_orders
+
+        key, results, df = polars_orders(data, date_range, key)
+        return (key, "polars", date_bounds(date_range)), results, df
+    key, df = load_orders(data, engine, date_range, downcast, key)
+    # Time/category/region/payment charts roll up a cube of the loaded rows.
+    # Once the whole dataset's cube exists, changing the date filter does not
+    # rescan rows for them; a filtered view never loads the full file for it.
+    bounds = date_bounds(date_range)
+    cube = cached_cube(key, engine, lambda: df, bounds)
+    # Distinct-count sketches are per day too, so they answer any date filter the same way
+    distinct = None
+    if approximate:
+        distinct = cached_distinct(key, engine, lambda: df, bounds=bounds)
+    # Measures are computed when first read and memoized per dataset view
+    view = (key, engine, bounds)
+    return view, Summary(df, cube, summary_store(*view, approximate), distinct, approximate), df
+
+
+def dashboard_tables(results, top_n=10):
+    """Every aggregate the dashboard displays, as named Series/DataFrames.
+
+    Per-customer tables are left out when ``results`` has no per-customer
+    state (approximate streaming).
+    """
+    tables = {
+        "kpis": pd.Series(dtype=object, data={
+            "total_revenue": results['total_revenue'],
+            "total_orders": results['total_orders'],
+            "unique_customers": results['unique_customers'],
+            "avg_order_value": results['avg_order_value'],
+            "undated_rows": results['nat_rows'],
+        }),
+        "daily_revenue": label_days(results['daily']),
+        "monthly_revenue": label_months(results['monthly']),
+        "top_products": results['top_products'].top(top_n),
+        "category_share": category_share(results['category_revenue']),
+        "top_customers": results['top_customers'].top(top_n),
+        "daily_customers": label_days(results['daily_customers']),
+        "monthly_customers": label_months(results['monthly_customers']),
+        "region_revenue": results['region_revenue'],
+        "payment_counts": results['payment_counts'],
+        "weekday_counts": label_weekdays(results['dayofweek_counts']),
+        "hourly_sales": results['hourly_sales'],
+        "weekend_sales": results['weekend_sales'],
+        "price_discount_percentiles": results['percentiles'],
+        "correlations": results['correlations'],
+        "covariance": results['covariance'],
+    }
+    orders_per_customer = results.get('orders_per_customer')
+    if orders_per_customer is not None:
+        tables["new_vs_repeat"] = pd.Series(new_vs_repeat(orders_per_customer))
+    return tables
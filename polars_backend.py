@@ -0,0 +1,323 @@
+# polars_backend.py
+"""The dashboard pipeline as one lazy Polars query plan.
+
+Loading, date parsing, feature engineering and every section's aggregation
+are expressions on a single ``LazyFrame``. ``pl.collect_all`` runs them
+together: the scan is shared between the aggregations, only the columns
+they use are read, date filters are pushed into Parquet scans, and the
+group-bys run on all cores. The results have the same names, index and
+values as the pandas path (``aggregates.Summary``), so the existing
+sections render them unchanged. Distinct counts are always exact.
+
+Polars is optional and only imported when this backend is used.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AGGREGATE_CACHE_MB, CORRELATION_COLUMNS, PERCENTILES, nbytes
+from cache import LRUCache
+from loader import (
+    DATE_COLUMN,
+    DATE_SAMPLE_SIZE,
+    NA_VALUES,
+    content_hash,
+    date_bounds,
+    detect_date_format,
+    sniff_format,
+)
+from profiling import stage
+from sketches import SpaceSaving
+
+# Summaries of whole Polars runs keyed by (file key, date bounds), bounded by bytes like SUMMARY_CACHE
+POLARS_CACHE = LRUCache(max_entries=8, max_bytes=AGGREGATE_CACHE_MB * 1024 * 1024, sizeof=nbytes)
+
+# Columns the pricing and correlation charts draw from the rows
+PRICING_COLUMNS = ['price', 'discount', 'revenue']
+
+
+def _schema():
+    import polars as pl
+
+    return {
+        "order_id": pl.String,
+        "customer_id": pl.String,
+        "product_id": pl.String,
+        "category": pl.String,
+        "region": pl.String,
+        "payment_method": pl.String,
+        "quantity": pl.Int32,
+        "price": pl.Float32,
+        "discount": pl.Float32,
+    }
+
+
+def scan_orders(source):
+    """LazyFrame of the order columns from CSV, Parquet or Feather bytes or a path."""
+    import polars as pl
+
+    fmt = sniff_format(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    schema = _schema()
+    if fmt == "parquet":
+        lf = pl.scan_parquet(source)
+    elif fmt == "feather":
+        lf = pl.scan_ipc(source)
+    else:
+        # Like the C parser: its missing-value markers, and "2.0" is a valid quantity
+        lf = pl.scan_csv(
+            source, schema_overrides={**schema, "quantity": pl.Float64, DATE_COLUMN: pl.String},
+            null_values=NA_VALUES,
+        )
+        # Polars reads blank lines as all-null rows, the C parser skips them (a
+        # line of bare separators is dropped too, where pandas keeps an undated row)
+        lf = lf.filter(~pl.all_horizontal(pl.all().is_null()))
+    names = lf.collect_schema().names()
+    # Dictionary-encoded Parquet/Feather labels become plain strings like CSV ones
+    return lf.select([pl.col(c).cast(dtype) for c, dtype in schema.items() if c in names] + [DATE_COLUMN])
+
+
+# A trailing UTC offset ("Z", "+02:00", "-0500") of a timestamp string
+UTC_OFFSET = r"\s*(?:Z|[+-]\d{2}:?\d{2})$"
+
+
+def _fallback_dates(strings, aware):
+    """The pandas path's ``format="mixed"`` fallback for distinct ``strings``, as naive wall times.
+
+    Returns None where ``loader.parse_order_dates`` would not use it: its
+    result is not a datetime column, or it is timezone-aware (``aware``)
+    when the detected format is not, or the other way around.
+    """
+    fallback = pd.to_datetime(pd.Series(strings, dtype=object), errors="coerce", format="mixed")
+    if not pd.api.types.is_datetime64_any_dtype(fallback.dtype):
+        return None
+    if aware is not None and (fallback.dt.tz is not None) != aware:
+        return None
+    return fallback.dt.tz_localize(None) if fallback.dt.tz is not None else fallback
+
+
+def parse_dates(lf):
+    """Parse ``order_date`` like ``loader.parse_order_dates``.
+
+    Strings go through the format ``loader.detect_date_format`` picks, in
+    Polars. The distinct strings it fails on get the pandas fallback
+    itself (usually a handful, or every distinct string when no format is
+    detected), so ambiguous day/month strings resolve as they do there.
+    Timezone-aware values keep their local wall time, as ``add_features``
+    does, whether they come as typed columns or as strings with offsets.
+    """
+    import polars as pl
+
+    dates = pl.col(DATE_COLUMN)
+    dtype = lf.collect_schema()[DATE_COLUMN]
+    if isinstance(dtype, pl.Datetime):
+        parsed = dates.dt.replace_time_zone(None) if dtype.time_zone else dates
+        return lf.with_columns(parsed.cast(pl.Datetime("us")).alias(DATE_COLUMN))
+    if dtype == pl.Date:
+        return lf.with_columns(dates.cast(pl.Datetime("us")).alias(DATE_COLUMN))
+    sample = lf.select(dates.drop_nulls().head(DATE_SAMPLE_SIZE * 10)).collect().to_series()
+    fmt = detect_date_format(sample.unique(maintain_order=True).to_list())
+    aware = None
+    parsed = pl.lit(None, dtype=pl.Datetime("us"))
+    if fmt is not None:
+        # Polars converts %z to UTC; pandas keeps the string's own wall time
+        aware = "%z" in fmt
+        strings = dates.str.replace(UTC_OFFSET, "") if aware else dates
+        wall_format = fmt.replace("%z", "").rstrip() if aware else fmt
+        parsed = strings.str.to_datetime(wall_format, strict=False, time_unit="us")
+    failed = lf.select(dates.filter(dates.is_not_null() & parsed.is_null()).unique()).collect().to_series()
+    fallback = _fallback_dates(failed.to_list(), aware) if len(failed) else None
+    if fallback is not None:
+        fallback = pl.Series(fallback.to_numpy(dtype="datetime64[us]"))
+        parsed = pl.coalesce(parsed, dates.replace_strict(failed, fallback, default=None))
+    return lf.with_columns(parsed.alias(DATE_COLUMN))
+
+
+def add_features(lf):
+    """``loader.add_features`` as expressions: revenue and calendar codes."""
+    import polars as pl
+
+    dates = pl.col(DATE_COLUMN)
+    weekday = dates.dt.weekday() - 1  # Polars counts Monday as 1
+    return lf.with_columns(
+        # Same operand order and widths as pandas, so revenue matches bit for bit
+        revenue=pl.col("quantity").cast(pl.Float64) * pl.col("price").cast(pl.Float64)
+        * (1 - pl.col("discount").cast(pl.Float64)),
+        day=(dates.dt.epoch("s") // 86400).cast(pl.Int32),
+        month=((dates.dt.year() - 1970) * 12 + dates.dt.month() - 1).cast(pl.Int32),
+        hour=dates.dt.hour().cast(pl.Int8),
+        dayofweek=weekday.cast(pl.Int8),
+        is_weekend=(weekday >= 5).fill_null(False),
+    )
+
+
+def filter_dates(lf, bounds):
+    import polars as pl
+
+    if bounds is None:
+        return lf
+    start, end = bounds
+    mask = pl.col(DATE_COLUMN) >= start
+    if end is not None:
+        mask &= pl.col(DATE_COLUMN) < end
+    return lf.filter(mask)
+
+
+def _pairwise(a, b, method="pearson"):
+    """Correlation over rows where both columns are present, like ``DataFrame.corr``."""
+    import polars as pl
+
+    both = pl.col(a).is_not_null() & pl.col(b).is_not_null()
+    x, y = pl.col(a).filter(both).cast(pl.Float64), pl.col(b).filter(both).cast(pl.Float64)
+    if method == "spearman":
+        x, y = x.rank("average"), y.rank("average")
+    if method == "covariance":
+        return pl.cov(x, y, ddof=1)
+    return pl.corr(x, y)
+
+
+def _matrix(row, method):
+    """Symmetric matrix from the upper-triangle pairs and per-column variances in ``row``."""
+    columns = CORRELATION_COLUMNS
+    values = np.full((len(columns), len(columns)), np.nan)
+    for i, a in enumerate(columns):
+        variance = row[f"variance:{a}"]
+        variance = np.nan if variance is None else variance
+        # Like pandas, a column correlates exactly 1 with itself when it varies at all
+        values[i, i] = variance if method == "covariance" else (1.0 if variance > 0 else np.nan)
+        for j in range(i + 1, len(columns)):
+            value = row[f"{method}:{a}:{columns[j]}"]
+            values[i, j] = values[j, i] = np.nan if value is None else value
+    return pd.DataFrame(values, index=columns, columns=columns)
+
+
+def _series(frame, key, value, name=None, index_dtype=None):
+    index = pd.Index(frame[key].to_numpy(), name=key)
+    if index_dtype is not None:
+        index = index.astype(index_dtype)
+    return pd.Series(frame[value].to_numpy(), index=index, name=name or value)
+
+
+def _rollup(lf, key, measure="revenue"):
+    import polars as pl
+
+    value = pl.col("revenue").sum() if measure == "revenue" else pl.len().alias("rows")
+    return lf.filter(pl.col(key).is_not_null()).group_by(key).agg(value).sort(key)
+
+
+def _distinct_per_group(lf, key, column):
+    import polars as pl
+
+    return (
+        lf.filter(pl.col(key).is_not_null())
+        .group_by(key)
+        .agg(pl.col(column).drop_nulls().n_unique())
+        .sort(key)
+    )
+
+
+def summarize_lazy(lf):
+    """Every dashboard aggregate of an engineered LazyFrame, as ``Summary`` returns them.
+
+    Also returns a pandas frame of ``PRICING_COLUMNS`` for the row-level charts.
+    """
+    import polars as pl
+
+    # Correlations are symmetric, so only pairs above the diagonal are computed
+    pairs = [(a, b) for i, a in enumerate(CORRELATION_COLUMNS) for b in CORRELATION_COLUMNS[i + 1:]]
+    totals = lf.select(
+        total_revenue=pl.col("revenue").sum(),
+        revenue_rows=pl.col("revenue").count(),
+        nat_rows=pl.col(DATE_COLUMN).null_count(),
+        total_orders=pl.col("order_id").drop_nulls().n_unique(),
+        unique_customers=pl.col("customer_id").drop_nulls().n_unique(),
+        **{
+            f"{column}:{q}": pl.col(column).cast(pl.Float64).quantile(q, interpolation="linear")
+            for column in ("price", "discount") for q in PERCENTILES
+        },
+        **{
+            f"{method}:{a}:{b}": _pairwise(a, b, method)
+            for method in ("pearson", "spearman", "covariance") for a, b in pairs
+        },
+        **{f"variance:{c}": pl.col(c).cast(pl.Float64).var(ddof=1) for c in CORRELATION_COLUMNS},
+    )
+    queries = {
+        "totals": totals,
+        "daily": _rollup(lf, "day"),
+        "monthly": _rollup(lf, "month"),
+        "category_revenue": _rollup(lf, "category"),
+        "region_revenue": _rollup(lf, "region"),
+        "payment_counts": _rollup(lf, "payment_method", "rows"),
+        "dayofweek_counts": _rollup(lf, "dayofweek", "rows"),
+        "hourly_sales": _rollup(lf, "hour"),
+        "weekend_sales": _rollup(lf, "is_weekend"),
+        "product_revenue": _rollup(lf, "product_id"),
+        "customers": (
+            lf.filter(pl.col("customer_id").is_not_null())
+            .group_by("customer_id")
+            .agg(pl.col("order_id").drop_nulls().n_unique(), pl.col("revenue").sum())
+            .sort("customer_id")
+        ),
+        "daily_customers": _distinct_per_group(lf, "day", "customer_id"),
+        "monthly_customers": _distinct_per_group(lf, "month", "customer_id"),
+        "pricing": lf.select(PRICING_COLUMNS),
+    }
+    frames = dict(zip(queries, pl.collect_all(list(queries.values()))))
+
+    row = frames["totals"].row(0, named=True)
+    revenue_rows = row["revenue_rows"]
+    customers = frames["customers"]
+    product_revenue = _series(frames["product_revenue"], "product_id", "revenue").rename_axis(None)
+    revenue_per_customer = _series(customers, "customer_id", "revenue").rename_axis(None)
+    results = {
+        "total_revenue": float(row["total_revenue"]),
+        "avg_order_value": row["total_revenue"] / revenue_rows if revenue_rows else float("nan"),
+        "nat_rows": int(row["nat_rows"]),
+        "daily": _series(frames["daily"], "day", "revenue", index_dtype="Int32"),
+        "monthly": _series(frames["monthly"], "month", "revenue", index_dtype="Int32"),
+        "category_revenue": _series(frames["category_revenue"], "category", "revenue"),
+        "region_revenue": _series(frames["region_revenue"], "region", "revenue"),
+        "payment_counts": _series(frames["payment_counts"], "payment_method", "rows")
+        .astype("int64").sort_values(ascending=False, kind="stable"),
+        "dayofweek_counts": _series(frames["dayofweek_counts"], "dayofweek", "rows", index_dtype="Int8")
+        .astype("int64").sort_values(ascending=False, kind="stable"),
+        "hourly_sales": _series(frames["hourly_sales"], "hour", "revenue", index_dtype="Int32"),
+        "weekend_sales": _series(frames["weekend_sales"], "is_weekend", "revenue"),
+        "total_orders": int(row["total_orders"]),
+        "unique_customers": int(row["unique_customers"]),
+        "product_revenue": product_revenue,
+        "orders_per_customer": _series(customers, "customer_id", "order_id").astype("int64").rename_axis(None),
+        "revenue_per_customer": revenue_per_customer,
+        "top_products": SpaceSaving.from_weights(product_revenue, capacity=None),
+        "top_customers": SpaceSaving.from_weights(revenue_per_customer, capacity=None),
+        "daily_customers": _series(frames["daily_customers"], "day", "customer_id").astype("int64"),
+        "monthly_customers": _series(frames["monthly_customers"], "month", "customer_id").astype("int64"),
+        "correlations": _matrix(row, "pearson"),
+        "covariance": _matrix(row, "covariance"),
+        "rank_correlations": _matrix(row, "spearman"),
+        "percentiles": pd.DataFrame(
+            {column: [row[f"{column}:{q}"] for q in PERCENTILES] for column in ("price", "discount")},
+            index=PERCENTILES, dtype="float64",
+        ),
+    }
+    return results, frames["pricing"].to_pandas()
+
+
+def summarize_orders(source, bounds=None):
+    """``(results, pricing frame)`` for a path or raw bytes, in one Polars query."""
+    with stage("load + aggregation (polars)"):
+        lf = filter_dates(add_features(parse_dates(scan_orders(source))), bounds)
+        return summarize_lazy(lf)
+
+
+def polars_orders(data, date_range=None, key=None):
+    """Return ``(key, results, pricing frame)`` for raw file bytes, cached like ``stream_orders``."""
+    key = key or content_hash(data)
+    bounds = date_bounds(date_range)
+    cached = POLARS_CACHE.get((key, bounds))
+    if cached is None:
+        cached = summarize_orders(data, bounds)
+        POLARS_CACHE.put((key, bounds), cached)
+    return (key, *cached)
@@ -0,0 +1,98 @@
+# profiling.py
+"""Opt-in wall time, CPU time and memory of the dashboard's stages.
+
+Code marks its stages with ``with stage(name):``; that is a no-op unless a
+``Profile`` was activated for the current run, so instrumented functions
+cost nothing when profiling is off. A stage that runs several times in one
+run (e.g. once per streamed chunk) is summed into one row.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+PROFILE_LOG = os.environ.get(
+    "EDA_PROFILE_LOG", os.path.join(os.path.expanduser("~"), ".cache", "ecommerce-eda", "profile.jsonl")
+)
+
+# The profile of the run executing in this thread/context, if any
+_ACTIVE = contextvars.ContextVar("profile", default=None)
+
+# Serializes appends from concurrent sessions of this process
+_LOG_LOCK = threading.Lock()
+
+
+def rss_bytes():
+    """Current resident set size; the peak so far where /proc is not available.
+
+    Returns 0 where neither is (Windows), so stages report no memory delta.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Profile:
+    """Per-stage totals of one rerun, in the order stages first ran.
+
+    CPU time is the whole process's, so it includes worker threads (e.g.
+    PyArrow's parser) and any concurrent sessions.
+    """
+
+    def __init__(self, kind="full"):
+        self.kind = kind
+        self.started = time.time()
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        wall, cpu, rss = time.perf_counter(), time.process_time(), rss_bytes()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(name, {"calls": 0, "wall_ms": 0.0, "cpu_ms": 0.0, "rss_delta_mb": 0.0})
+            totals["calls"] += 1
+            totals["wall_ms"] += (time.perf_counter() - wall) * 1000
+            totals["cpu_ms"] += (time.process_time() - cpu) * 1000
+            totals["rss_delta_mb"] += (rss_bytes() - rss) / 1e6
+
+    def rows(self):
+        return [{"stage": name, **totals} for name, totals in self.stages.items()]
+
+    def write(self, path=PROFILE_LOG):
+        """Append one JSON line per stage to ``path``."""
+        if not self.stages:
+            return
+        lines = "".join(
+            json.dumps({"time": self.started, "run": self.kind, **row}, ensure_ascii=False) + "\n"
+            for row in self.rows()
+        )
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with _LOG_LOCK, open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def activate(profile):
+    """Make ``profile`` (or None to stop profiling) receive this run's stages."""
+    _ACTIVE.set(profile)
+
+
+def active():
+    return _ACTIVE.get()
+
+
+def stage(name):
+    """Time the enclosed block into the active profile, if any."""
+    profile = _ACTIVE.get()
+    return profile.stage(name) if profile is not None else contextlib.nullcontext()
@@ -0,0 +1,428 @@
+# sketches.py
+"""Mergeable summaries for data too large to aggregate in one piece.
+
+Every sketch can be updated chunk by chunk and merged with another sketch
+of the same kind, so results over several chunks, files or partitions do
+not depend on how the rows were split.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+# HyperLogLog registers per sketch are 2 ** precision (one byte each)
+HLL_PRECISION = int(os.environ.get("EDA_HLL_PRECISION", 14))
+
+
+def hash_keys(key):
+    """64-bit hash per row of a ``aggregates.Factorized`` key (0 where missing).
+
+    Only the key's unique values are hashed. Integer keys are hashed as
+    their decimal strings, so an id hashes alike whether it was read as a
+    label (``"1042"``), inferred as any integer dtype or downcast.
+    """
+    uniques = key.uniques
+    if pd.api.types.is_integer_dtype(uniques.dtype):
+        uniques = pd.Index(uniques.to_numpy(dtype="int64").astype(str))
+    hashes = pd.util.hash_pandas_object(uniques, index=False).to_numpy()
+    return np.append(hashes, np.uint64(0))[key.bins]
+
+
+def hll_error(precision=HLL_PRECISION):
+    """Relative standard error of a HyperLogLog estimate."""
+    return 1.04 / np.sqrt(2 ** precision)
+
+
+def _cells(hashes, precision):
+    """Register index and rank (position of the first set bit) per hash."""
+    index = (hashes >> np.uint64(64 - precision)).astype("int64")
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    # Bit length from the float exponent, split in halves so no bits are rounded away
+    high = np.frexp((rest >> np.uint64(32)).astype("float64"))[1]
+    low = np.frexp((rest & np.uint64(0xFFFFFFFF)).astype("float64"))[1]
+    length = np.where(high > 0, high + 32, low)
+    rank = (64 - precision - length + 1).astype("uint8")
+    return index, rank
+
+
+def _sigma(x):
+    y, z = 1.0, x.copy()
+    for _ in range(64):
+        x = x * x
+        z = z + x * y
+        y += y
+    return z
+
+
+def _tau(x):
+    y, z = 1.0, 1 - x
+    for _ in range(64):
+        x = np.sqrt(x)
+        y *= 0.5
+        z = z - (1 - x) ** 2 * y
+    return z / 3
+
+
+def _estimate(registers):
+    """Cardinality estimates for the last axis of a register array.
+
+    Uses Ertl's improved estimator ("New cardinality estimation algorithms
+    for HyperLogLog sketches", 2017), which needs no empirical bias tables
+    and stays unbiased through the small-to-large cardinality transition.
+    """
+    registers = np.atleast_2d(registers)
+    groups, size = registers.shape
+    top = 64 - int(np.log2(size)) + 1
+    rows = np.repeat(np.arange(groups), size)
+    counts = np.bincount(rows * (top + 1) + registers.ravel(), minlength=groups * (top + 1))
+    counts = counts.reshape(groups, top + 1).astype("float64")
+    z = size * _tau(1 - counts[:, top] / size)
+    for k in range(top - 1, 0, -1):
+        z = 0.5 * (z + counts[:, k])
+    with np.errstate(over="ignore", invalid="ignore"):
+        z = z + size * _sigma(counts[:, 0] / size)
+        estimate = size * size / (2 * np.log(2)) / z
+    return np.where(counts[:, 0] == size, 0.0, estimate)
+
+
+class HyperLogLog:
+    """Approximate distinct count in ``2 ** precision`` bytes.
+
+    The relative standard error is ``1.04 / sqrt(2 ** precision)``, e.g.
+    0.8% at the default precision of 14. Merging takes the register-wise
+    maximum, so a merged sketch equals one built from all rows at once.
+    """
+
+    def __init__(self, precision=HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype="uint8") if registers is None else registers
+
+    def update(self, hashes):
+        """Add 64-bit hashes, e.g. from ``hash_keys``."""
+        index, rank = _cells(hashes, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def estimate(self):
+        return float(_estimate(self.registers)[0])
+
+
+class GroupedHyperLogLog:
+    """One HyperLogLog per group, stored as a ``groups x registers`` array.
+
+    ``groups`` is an ``Index`` of group keys (missing keys allowed), e.g.
+    days since 1970-01-01. Sketches of groups present in both sides are
+    merged when two grouped sketches are combined.
+    """
+
+    def __init__(self, groups, registers, precision=HLL_PRECISION):
+        self.groups = groups
+        self.registers = registers
+        self.precision = precision
+
+    @classmethod
+    def from_hashes(cls, groups, codes, hashes, precision=HLL_PRECISION):
+        """Sketch per group from row ``hashes`` and their group ``codes`` into ``groups``.
+
+        Only groups that received at least one hash are kept.
+        """
+        index, rank = _cells(hashes, precision)
+        size = 2 ** precision
+        registers = np.zeros(len(groups) * size, dtype="uint8")
+        np.maximum.at(registers, codes * size + index, rank)
+        observed = np.bincount(codes, minlength=len(groups)) > 0
+        return cls(groups[observed], registers.reshape(len(groups), size)[observed], precision)
+
+    @property
+    def nbytes(self):
+        return self.registers.nbytes
+
+    def select(self, mask):
+        return GroupedHyperLogLog(self.groups[mask], self.registers[mask], self.precision)
+
+    def rollup(self, labels):
+        """Merge the groups that share a label in ``labels`` (aligned with ``groups``)."""
+        codes, uniques = pd.factorize(labels, sort=True, use_na_sentinel=False)
+        registers = np.zeros((len(uniques), self.registers.shape[1]), dtype="uint8")
+        np.maximum.at(registers, codes, self.registers)
+        return GroupedHyperLogLog(pd.Index(uniques), registers, self.precision)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        if not len(other.groups):
+            return self
+        if not len(self.groups):
+            return other
+        labels = self.groups.append(other.groups)
+        stacked = GroupedHyperLogLog(labels, np.concatenate([self.registers, other.registers]), self.precision)
+        return stacked.rollup(labels)
+
+    def union(self):
+        """One sketch over every group."""
+        return HyperLogLog(self.precision, self.registers.max(axis=0, initial=0))
+
+    def estimates(self):
+        """Estimated distinct count per group."""
+        return pd.Series(np.round(_estimate(self.registers)).astype("int64"), index=self.groups)
+
+
+# Counters kept per top-k summary; any count is overestimated by at most total / capacity
+TOPK_CAPACITY = int(os.environ.get("EDA_TOPK_CAPACITY", 10_000))
+
+
+def _reindex(series, keys, fill):
+    return series.reindex(keys, fill_value=fill).to_numpy(dtype="float64")
+
+
+class SpaceSaving:
+    """Weighted heavy hitters (SpaceSaving) with at most ``capacity`` counters.
+
+    ``counts`` never underestimate a key's total weight and overestimate it
+    by at most its ``errors`` entry. A key without a counter has a total of
+    at most ``floor``, which never exceeds ``total / capacity``. Summaries
+    are built from per-chunk totals and merged like Cafaro et al.'s
+    parallel SpaceSaving; ``capacity=None`` keeps every key (exact mode).
+    """
+
+    def __init__(self, counts, errors, floor=0.0, total=0.0, capacity=TOPK_CAPACITY):
+        self.counts = counts
+        self.errors = errors
+        self.floor = floor
+        self.total = total
+        self.capacity = capacity
+
+    @classmethod
+    def from_weights(cls, weights, capacity=TOPK_CAPACITY):
+        """Summary of exact per-key totals, e.g. ``Aggregator.sum('product_id')`` of one chunk."""
+        weights = weights.astype("float64")
+        summary = cls(weights, pd.Series(0.0, index=weights.index), 0.0, float(weights.sum()), capacity)
+        return summary._truncate(0.0)
+
+    @classmethod
+    def empty(cls, capacity=TOPK_CAPACITY):
+        return cls.from_weights(pd.Series(dtype="float64"), capacity)
+
+    def _truncate(self, floor):
+        """Keep the ``capacity`` largest counters; dropped counts bound every absent key."""
+        if self.capacity is None or len(self.counts) <= self.capacity:
+            self.floor = floor
+            return self
+        order = np.argsort(-self.counts.to_numpy(), kind="stable")
+        kept, dropped = order[:self.capacity], order[self.capacity:]
+        self.floor = max(floor, float(self.counts.iloc[dropped].max()))
+        self.counts = self.counts.iloc[kept]
+        self.errors = self.errors.iloc[kept]
+        return self
+
+    def merge(self, other):
+        keys = self.counts.index.union(other.counts.index)
+        counts = _reindex(self.counts, keys, self.floor) + _reindex(other.counts, keys, other.floor)
+        errors = _reindex(self.errors, keys, self.floor) + _reindex(other.errors, keys, other.floor)
+        capacities = [c for c in (self.capacity, other.capacity) if c is not None]
+        merged = SpaceSaving(
+            pd.Series(counts, index=keys, name=self.counts.name or other.counts.name),
+            pd.Series(errors, index=keys),
+            total=self.total + other.total,
+            capacity=min(capacities) if capacities else None,
+        )
+        return merged._truncate(self.floor + other.floor)
+
+    def update(self, weights):
+        return self.merge(SpaceSaving.from_weights(weights, self.capacity))
+
+    @property
+    def exact(self):
+        return self.floor == 0 and not self.errors.any()
+
+    def top(self, n):
+        """The ``n`` heaviest keys with their count, error bound and guarantee.
+
+        ``guaranteed`` marks keys certain to be among the true top ``n``:
+        their lowest possible total beats the count of every key ranked below.
+        """
+        counts = self.counts.sort_values(ascending=False, kind="stable")
+        below = counts.iloc[n] if len(counts) > n else self.floor
+        top = counts.iloc[:n]
+        errors = self.errors.reindex(top.index)
+        return pd.DataFrame({
+            top.name or "count": top,
+            "error": errors,
+            "guaranteed": (top - errors) >= max(below, self.floor),
+        })
+
+
+# Compactor size of the quantile sketch; rank error stays around 2 / k of the count (0.5% at 400)
+QUANTILE_K = int(os.environ.get("EDA_QUANTILE_K", 400))
+
+
+class KLL:
+    """Mergeable quantile sketch (Karnin, Lang & Liberty) of about ``3 * k`` floats.
+
+    Level ``h`` holds a sample of the values, each standing for ``2 ** h``
+    of them. A full level is sorted and every other item (random offset) is
+    promoted one level up, so the sketch stays bounded however many values
+    are added. Minimum and maximum are tracked exactly. Compaction draws
+    from a fixed seed, so the same input always gives the same sketch.
+    """
+
+    def __init__(self, k=QUANTILE_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (len(self.levels) - level - 1))))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            odd = len(items) % 2
+            promoted = items[odd + self._rng.integers(2)::2]
+            self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # A new top level shrinks the capacity of every level below it
+            level = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        merged = KLL(min(self.k, other.k))
+        depth = max(len(self.levels), len(other.levels))
+        merged.levels = [
+            np.concatenate([side.levels[h] for side in (self, other) if h < len(side.levels)])
+            for h in range(depth)
+        ]
+        merged.n = self.n + other.n
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        merged._compress()
+        return merged
+
+    def items(self):
+        """Retained values and the number of values each stands for, sorted by value."""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        return values[order], weights[order]
+
+    def quantiles(self, qs):
+        """Approximate values at quantiles ``qs`` (0 and 1 give the exact min and max)."""
+        qs = np.asarray(qs, dtype="float64")
+        if not self.n:
+            return np.full(qs.shape, np.nan)
+        values, weights = self.items()
+        ranks = np.cumsum(weights)
+        positions = np.searchsorted(ranks, qs * ranks[-1], side="left")
+        result = values[np.clip(positions, 0, len(values) - 1)]
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
+
+    def ranks(self, values):
+        """Approximate mid-ranks of ``values`` as fractions of ``n`` (ties share their average rank)."""
+        values = np.asarray(values, dtype="float64")
+        items, weights = self.items()
+        below = np.concatenate([[0.0], np.cumsum(weights)])
+        lower = below[np.searchsorted(items, values, side="left")]
+        upper = below[np.searchsorted(items, values, side="right")]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(np.isnan(values), np.nan, (lower + upper) / 2 / below[-1])
+
+
+class CoMoments:
+    """Running means, variances and co-moments of a few numeric columns.
+
+    Statistics are kept per column pair over the rows where both values are
+    present, like ``DataFrame.corr()``'s pairwise deletion. Each chunk is
+    centred on its own means before summing, and chunks are combined with
+    Chan et al.'s pairwise update, so the result stays accurate however many
+    chunks or processes contribute. ``mean[i, j]`` and ``m2[i, j]`` describe
+    column ``i`` over the rows shared with column ``j``.
+    """
+
+    def __init__(self, columns, n, mean, m2, comoment):
+        self.columns = list(columns)
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.comoment = comoment
+
+    @classmethod
+    def empty(cls, columns):
+        size = len(columns)
+        zeros = np.zeros((size, size))
+        return cls(columns, zeros.copy(), zeros.copy(), zeros.copy(), zeros.copy())
+
+    @classmethod
+    def from_frame(cls, df, columns):
+        values = np.column_stack([df[c].to_numpy(dtype="float64", na_value=np.nan) for c in columns])
+        valid = ~np.isnan(values)
+        if not valid.any():
+            return cls.empty(columns)
+        counts = valid.sum(axis=0)
+        shift = np.where(counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0)
+        centred = np.where(valid, values - shift, 0.0)
+        present = valid.astype("float64")
+        n = present.T @ present
+        sums = centred.T @ present
+        squares = (centred ** 2).T @ present
+        products = centred.T @ centred
+        with np.errstate(invalid="ignore", divide="ignore"):
+            inner = np.where(n > 0, sums / n, 0.0)
+        return cls(
+            columns,
+            n,
+            inner + shift[:, None],
+            squares - sums * inner,
+            products - sums * inner.T,
+        )
+
+    def merge(self, other):
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            share = np.where(n > 0, other.n / n, 0.0)
+        return CoMoments(
+            self.columns,
+            n,
+            self.mean + delta * share,
+            self.m2 + other.m2 + delta ** 2 * weight,
+            self.comoment + other.comoment + delta * delta.T * weight,
+        )
+
+    def covariance(self):
+        """Sample covariance, like ``DataFrame.cov()``."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = np.where(self.n > 1, self.comoment / (self.n - 1), np.nan)
+        return pd.DataFrame(cov, index=self.columns, columns=self.columns)
+
+    def correlation(self):
+        """Pearson correlation, like ``DataFrame.corr()``."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr = np.where(self.n > 1, np.clip(corr, -1, 1), np.nan)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
@@ -0,0 +1,335 @@
+# streaming.py
+import io
+
+import numpy as np
+import pandas as pd
+
+from aggregates import (
+    AGGREGATE_CACHE_MB,
+    CORRELATION_COLUMNS,
+    SKETCH_RESULTS,
+    Aggregator,
+    Cube,
+    DailyDistinct,
+    PricingSketches,
+    Summary,
+    day_months,
+    nbytes,
+    summarize_cube,
+)
+from cache import LRUCache
+from loader import (
+    COLUMNS,
+    DATE_COLUMN,
+    DATE_SAMPLE_SIZE,
+    add_features,
+    conform_table,
+    content_hash,
+    date_bounds,
+    detect_date_format,
+    feather_batches,
+    filter_dates,
+    parquet_row_groups,
+    parse_dates,
+    read_csv_typed,
+    sniff_format,
+)
+from profiling import stage
+from sketches import KLL, CoMoments, SpaceSaving
+
+DEFAULT_CHUNK_ROWS = 500_000
+
+# Revenue sums folded per chunk for keys too large for the cube: result name -> group key
+SUM_KEYS = {
+    "product_revenue": "product_id",
+    "revenue_per_customer": "customer_id",
+}
+
+# Top-k summaries and the per-key sums they are read from in exact mode
+TOP_KEYS = {
+    "top_products": "product_revenue",
+    "top_customers": "revenue_per_customer",
+}
+
+# Finished summaries of streamed files and saved datasets. Exact ones keep a
+# row per product and customer, so they are bounded by bytes too.
+SUMMARY_CACHE = LRUCache(max_entries=8, max_bytes=AGGREGATE_CACHE_MB * 1024 * 1024, sizeof=nbytes)
+
+
+def _add(total, part):
+    if total is None:
+        return part
+    return total.add(part, fill_value=0)
+
+
+class UniqueRows:
+    """Distinct rows seen across chunks.
+
+    New chunks are buffered and only merged into the deduplicated frame once
+    the buffer outgrows it, so the amortised cost per chunk stays linear.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._frame = pd.DataFrame(columns=self.columns)
+        self._pending = []
+        self._pending_rows = 0
+
+    def add(self, frame):
+        frame = frame[self.columns].dropna().drop_duplicates()
+        self._pending.append(frame)
+        self._pending_rows += len(frame)
+        if self._pending_rows > len(self._frame):
+            self._compact()
+
+    def _compact(self):
+        if self._pending:
+            frames = [f for f in [self._frame, *self._pending] if len(f)]
+            if frames:
+                self._frame = pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+            self._pending = []
+            self._pending_rows = 0
+
+    @property
+    def frame(self):
+        self._compact()
+        return self._frame
+
+
+class RunningAggregates:
+    """Dashboard aggregates folded chunk by chunk.
+
+    Only per-group state is retained, so peak memory depends on the number of
+    days, products, customers, ... rather than on the number of rows; price,
+    discount and revenue distributions are kept as quantile sketches and the
+    correlation columns as co-moments. With
+    ``approximate`` set, no per-product or per-customer state is kept at
+    all: distinct counts go to HyperLogLog sketches and top products and
+    customers to SpaceSaving summaries, so memory stays bounded. Lifetime
+    revenue and order counts per customer are then not available.
+    ``date_format`` is the ``order_date`` format the rows were parsed with,
+    so files appended later are parsed the same way.
+    """
+
+    def __init__(self, approximate=False):
+        self.rows = 0
+        self.date_format = None
+        self.cube = None
+        self.pricing = PricingSketches.empty()
+        self.moments = CoMoments.empty(CORRELATION_COLUMNS)
+        self.quantiles = {column: KLL() for column in CORRELATION_COLUMNS}
+        self.approximate = approximate
+        if approximate:
+            self.distinct = DailyDistinct.empty()
+            self.top = {name: SpaceSaving.empty() for name in TOP_KEYS}
+        else:
+            self.sums = {}
+            self.orders = UniqueRows(["order_id"])
+            self.customer_orders = UniqueRows(["customer_id", "order_id"])
+            self.customer_days = UniqueRows(["day", "customer_id"])
+
+    def update(self, chunk):
+        """Fold one engineered chunk into the running state."""
+        self.rows += len(chunk)
+        agg = Aggregator(chunk)
+        cube = Cube.from_frame(chunk, agg)
+        self.cube = cube if self.cube is None else self.cube.merge(cube)
+        self.pricing = self.pricing.merge(PricingSketches.from_frame(chunk))
+        self.moments = self.moments.merge(CoMoments.from_frame(chunk, CORRELATION_COLUMNS))
+        for column, sketch in self.quantiles.items():
+            sketch.update(chunk[column].to_numpy(dtype="float64", na_value=np.nan))
+        if self.approximate:
+            self.distinct = self.distinct.merge(DailyDistinct.from_frame(chunk, agg))
+            for name, sums in TOP_KEYS.items():
+                self.top[name] = self.top[name].update(agg.sum(SUM_KEYS[sums]))
+            return self
+        for name, key in SUM_KEYS.items():
+            self.sums[name] = _add(self.sums.get(name), agg.sum(key))
+        self.orders.add(chunk)
+        self.customer_orders.add(chunk)
+        self.customer_days.add(chunk)
+        return self
+
+    def merge(self, other):
+        """Fold the state of other rows, e.g. a newly appended file, into this one."""
+        if other.approximate != self.approximate:
+            raise ValueError("cannot merge exact and approximate aggregates")
+        self.rows += other.rows
+        self.date_format = self.date_format or other.date_format
+        if other.cube is not None:
+            self.cube = other.cube if self.cube is None else self.cube.merge(other.cube)
+        self.pricing = self.pricing.merge(other.pricing)
+        self.moments = self.moments.merge(other.moments)
+        self.quantiles = {column: sketch.merge(other.quantiles[column]) for column, sketch in self.quantiles.items()}
+        if self.approximate:
+            self.distinct = self.distinct.merge(other.distinct)
+            self.top = {name: summary.merge(other.top[name]) for name, summary in self.top.items()}
+            return self
+        for name, sums in other.sums.items():
+            self.sums[name] = _add(self.sums.get(name), sums)
+        self.orders.add(other.orders.frame)
+        self.customer_orders.add(other.customer_orders.frame)
+        self.customer_days.add(other.customer_days.frame)
+        return self
+
+    def summary(self):
+        """Return the same result dict as ``aggregates.summarize_frame``."""
+        cube = self.cube or Cube.empty()
+        results = summarize_cube(cube)
+        results.update(
+            pricing=self.pricing,
+            percentiles=self.pricing.percentiles(),
+            moments=self.moments,
+            correlations=self.moments.correlation(),
+            covariance=self.moments.covariance(),
+            quantiles=self.quantiles,
+        )
+        if self.approximate:
+            summary = Summary(None, cube, distinct=self.distinct, approximate=True)
+            results.update({name: summary[name] for name in SKETCH_RESULTS})
+            results.update(self.top)
+            return results
+        for name in SUM_KEYS:
+            results[name] = self.sums.get(name, pd.Series(dtype="float64", name="revenue")).sort_index()
+        for name, sums in TOP_KEYS.items():
+            results[name] = SpaceSaving.from_weights(results[sums], capacity=None)
+        orders_per_customer = self.customer_orders.frame.groupby("customer_id", observed=True)['order_id'].size()
+        revenue_per_customer = results["revenue_per_customer"]
+        days = self.customer_days.frame
+        agg = Aggregator(days.assign(month=day_months(days['day'])))
+        results.update(
+            total_orders=len(self.orders.frame),
+            unique_customers=len(revenue_per_customer),
+            orders_per_customer=orders_per_customer.reindex(revenue_per_customer.index, fill_value=0),
+            daily_customers=agg.distinct_per_group('day', 'customer_id').rename_axis('day'),
+            monthly_customers=agg.distinct_per_group('month', 'customer_id').rename_axis('month'),
+        )
+        return results
+
+
+def _raw_chunks(source, chunk_rows, bounds):
+    fmt = sniff_format(source)
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        batches = parquet_file.iter_batches(
+            batch_size=chunk_rows,
+            row_groups=parquet_row_groups(parquet_file, bounds),
+            columns=[c for c in COLUMNS if c in parquet_file.schema_arrow.names],
+        )
+        for batch in batches:
+            yield conform_table(pa.Table.from_batches([batch]))
+    elif fmt == "feather":
+        import pyarrow as pa
+
+        _, batches = feather_batches(source, chunk_rows)
+        for batch in batches:
+            yield conform_table(pa.Table.from_batches([batch]))
+    else:
+        yield from read_csv_typed(source, chunksize=chunk_rows)
+
+
+def sample_date_format(source, chunk_rows=DEFAULT_CHUNK_ROWS, bounds=None):
+    """The ``order_date`` format of a whole file, or None for native timestamps.
+
+    Detected from the file's first ``DATE_SAMPLE_SIZE`` distinct strings,
+    the sample the in-memory path uses, so streamed dates do not depend on
+    the chunk size. Reading stops once the sample is full, files with fewer
+    distinct dates are read to the end. A buffer's position is restored.
+    """
+    position = source.tell() if hasattr(source, "tell") else None
+    sample = {}
+    chunks = _raw_chunks(source, chunk_rows, bounds)
+    try:
+        for chunk in chunks:
+            dates = chunk[DATE_COLUMN]
+            if pd.api.types.is_datetime64_any_dtype(dates.dtype):
+                return None
+            sample.update(dict.fromkeys(pd.unique(dates.dropna().astype(str))))
+            if len(sample) >= DATE_SAMPLE_SIZE:
+                break
+    finally:
+        chunks.close()
+        if position is not None:
+            source.seek(position)
+    if not sample:
+        return None
+    return detect_date_format(list(sample)) or "mixed"
+
+
+def iter_chunks(source, chunk_rows=DEFAULT_CHUNK_ROWS, bounds=None, date_format=None):
+    """Yield engineered chunks from a CSV, Parquet or Feather path or buffer.
+
+    CSV, Parquet and Feather v1 chunks hold at most ``chunk_rows`` rows,
+    Feather v2 chunks follow the file's record batches. Rows outside
+    ``bounds`` are dropped. Every chunk's dates are parsed with
+    ``date_format``, sampled from the file when not given.
+    """
+    if date_format is None:
+        with stage("date parsing"):
+            date_format = sample_date_format(source, chunk_rows, bounds)
+    chunks = _raw_chunks(source, chunk_rows, bounds)
+    while True:
+        with stage("load"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            return
+        with stage("date parsing"):
+            chunk = parse_dates(chunk, date_format=date_format)
+        with stage("feature engineering"):
+            chunk = filter_dates(add_features(chunk), bounds)
+        yield chunk
+
+
+def stream_aggregates(source, chunk_rows=DEFAULT_CHUNK_ROWS, bounds=None, approximate=False, date_format=None):
+    running = RunningAggregates(approximate)
+    if date_format is None:
+        with stage("date parsing"):
+            date_format = sample_date_format(source, chunk_rows, bounds)
+    running.date_format = date_format
+    for chunk in iter_chunks(source, chunk_rows, bounds, date_format):
+        with stage("aggregation"):
+            running.update(chunk)
+    return running
+
+
+def stream_orders(data, chunk_rows=DEFAULT_CHUNK_ROWS, date_range=None, approximate=False, key=None):
+    """Return ``(key, results)`` for raw file bytes without building a full frame.
+
+    ``key`` is ``content_hash(data)`` when the caller already knows it.
+    """
+    key = key or content_hash(data)
+    bounds = date_bounds(date_range)
+    results = SUMMARY_CACHE.get((key, bounds, approximate))
+    if results is None:
+        results = stream_aggregates(io.BytesIO(data), chunk_rows, bounds, approximate).summary()
+        SUMMARY_CACHE.put((key, bounds, approximate), results)
+    return key, results
+
+
+def stream_rank_correlations(source, quantiles, chunk_rows=DEFAULT_CHUNK_ROWS, bounds=None):
+    """Approximate Spearman correlation of ``CORRELATION_COLUMNS`` in a second pass.
+
+    Each value is replaced by its mid-rank in ``quantiles`` (the first
+    pass's per-column sketches) and the ranks are fed to ``CoMoments``.
+    """
+    moments = CoMoments.empty(CORRELATION_COLUMNS)
+    for chunk in iter_chunks(source, chunk_rows, bounds):
+        ranks = pd.DataFrame({
+            column: quantiles[column].ranks(chunk[column].to_numpy(dtype="float64", na_value=np.nan))
+            for column in CORRELATION_COLUMNS
+        })
+        moments = moments.merge(CoMoments.from_frame(ranks, CORRELATION_COLUMNS))
+    return moments.correlation()
+
+
+def stream_rank_orders(data, quantiles, chunk_rows=DEFAULT_CHUNK_ROWS, date_range=None, key=None):
+    """``stream_rank_correlations`` for raw file bytes, cached like ``stream_orders``."""
+    key = (key or content_hash(data), date_bounds(date_range), "spearman")
+    correlations = SUMMARY_CACHE.get(key)
+    if correlations is None:
+        correlations = stream_rank_correlations(io.BytesIO(data), quantiles, chunk_rows, key[1])
+        SUMMARY_CACHE.put(key, correlations)
+    return correlations
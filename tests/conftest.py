@@ -0,0 +1,66 @@
+# conftest.py
+"""Messy order exports shared by the parity tests, and the import path for the flat modules."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+HEADER = "order_id,customer_id,product_id,category,region,payment_method,quantity,price,discount,order_date\n"
+
+# Missing and empty labels, NA markers, a quoted empty string, integral and missing quantities
+LABELS = [
+    "1,C1,P1,Books,North,card,2,10.5,0.1,{}",
+    "2,,P2,Toys,South,paypal,1,20,0,{}",
+    "3,C2,,NA,East,\"\",3,5,0.2,{}",
+    "4,C1,P1,,West,card,2.0,10.5,,{}",
+    "5,N/A,P3,Books,,cod,,7.25,0,{}",
+    "6,C3,P2,Toys,North,null,4,,0.5,{}",
+    ",C2,P3,Garden,South,card,1,3,0,{}",
+    "8,C3,P1,Books,East,gift_card,5,10.5,0.05,{}",
+]
+
+
+def orders_csv(dates):
+    rows = [row.format(date) for row, date in zip(LABELS * (len(dates) // len(LABELS) + 1), dates)]
+    return (HEADER + "\n".join(rows) + "\n").encode()
+
+
+def days(template, count=16):
+    return [template.format(day=day, hour=(day * 5) % 24) for day in range(1, count + 1)]
+
+
+CASES = {
+    "iso": days("2023-01-{day:02d} {hour:02d}:15:00"),
+    "unparseable": days("2023-01-{day:02d} {hour:02d}:15:00")[:-3] + ["not a date", "", "2023-13-45 99:00:00"],
+    "utc": days("2023-01-{day:02d}T{hour:02d}:15:00Z"),
+    "offset": days("2023-01-{day:02d} {hour:02d}:15:00+02:00"),
+    "offset_near_midnight": days("2023-01-{day:02d}T23:30:00-05:00"),
+    "day_first": days("{day:02d}/03/2023 {hour:02d}:15"),
+    "ambiguous_with_unparseable": ["01/02/2023 10:00", "garbage"],
+    "ambiguous_mixed_styles": ["01/02/2023 10:00", "2023-01-03 11:00:00", "\"March 4, 2023\"", "junk"] * 2,
+    "mostly_unparseable": ["05/06/2023"] + ["n/a?"] * 7,
+}
+
+FILTERS = {
+    "all": None,
+    "range": (pd.Timestamp("2023-01-03"), pd.Timestamp("2023-01-10")),
+    "open_end": (pd.Timestamp("2023-01-05"), None),
+}
+
+
+@pytest.fixture(params=CASES, ids=str)
+def csv_path(request, tmp_path):
+    """Path of each case in ``CASES`` written as a CSV export."""
+    path = tmp_path / f"{request.param}.csv"
+    path.write_bytes(orders_csv(CASES[request.param]))
+    return str(path)
+
+
+@pytest.fixture(params=FILTERS.values(), ids=FILTERS.keys())
+def bounds(request):
+    """Each date filter in ``FILTERS``, as ``loader.date_bounds`` returns them."""
+    return request.param
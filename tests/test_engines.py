@@ -0,0 +1,31 @@
+# test_engines.py
+"""The C and PyArrow CSV engines, and Feather files, load into the same results."""
+import io
+import warnings
+
+import pandas as pd
+import pytest
+
+from bench_polars import check_parity, summarize_pandas
+from conftest import CASES, orders_csv
+from streaming import stream_aggregates
+
+
+def test_csv_engine_parity(csv_path, bounds):
+    check_parity(summarize_pandas(csv_path, bounds, "c"), summarize_pandas(csv_path, bounds, "pyarrow"))
+
+
+@pytest.mark.parametrize("version, compression", [(1, None), (2, "lz4")], ids=["v1", "v2-lz4"])
+def test_feather_parity(tmp_path, bounds, version, compression):
+    import pyarrow.feather as feather
+
+    data = orders_csv(CASES["iso"])
+    csv_path, feather_path = tmp_path / "orders.csv", tmp_path / "orders.feather"
+    csv_path.write_bytes(data)
+    df = pd.read_csv(io.BytesIO(data), dtype={"order_id": "string"})
+    df["notes"] = "not a dashboard column"
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        feather.write_feather(df, feather_path, version=version, compression=compression)
+    check_parity(summarize_pandas(str(csv_path), bounds), summarize_pandas(str(feather_path), bounds))
+    assert stream_aggregates(str(feather_path), 5, bounds).rows == stream_aggregates(str(csv_path), 5, bounds).rows
@@ -0,0 +1,38 @@
+# test_polars_backend.py
+"""The Polars backend returns the pandas path's results on messy inputs.
+
+Every case goes through both backends with and without a date filter and
+is compared with ``bench_polars.check_parity``, result by result.
+"""
+import io
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("polars")
+
+from bench_polars import check_parity, summarize_pandas, summarize_polars  # noqa: E402
+from conftest import CASES, orders_csv  # noqa: E402
+
+
+def test_csv_parity(csv_path, bounds):
+    check_parity(summarize_pandas(csv_path, bounds), summarize_polars(csv_path, bounds))
+
+
+def test_blank_lines(tmp_path, bounds):
+    path = tmp_path / "orders.csv"
+    path.write_bytes(orders_csv(CASES["iso"]).replace(b"\n", b"\n\n", 4) + b"\n")
+    expected = summarize_pandas(str(path), bounds)
+    assert expected["nat_rows"] == 0
+    check_parity(expected, summarize_polars(str(path), bounds))
+
+
+@pytest.mark.parametrize("tz", [None, "UTC", "Europe/Berlin"])
+def test_parquet_parity(tmp_path, tz, bounds):
+    df = pd.read_csv(io.BytesIO(orders_csv(CASES["iso"])), dtype={"order_id": "string", "quantity": "Float64"})
+    dates = pd.to_datetime(df["order_date"])
+    df["order_date"] = dates if tz is None else dates.dt.tz_localize(tz)
+    path = tmp_path / "orders.parquet"
+    df.to_parquet(path)
+    check_parity(summarize_pandas(str(path), bounds), summarize_polars(str(path), bounds))
+
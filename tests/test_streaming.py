@@ -0,0 +1,31 @@
+# test_streaming.py
+"""Streamed files and dataset appends parse dates like the in-memory path, whatever the chunk size."""
+import pandas as pd
+import pytest
+
+import datasets
+from aggregates import CUBE_RESULTS
+from bench_aggregates import check_equal
+from bench_polars import summarize_pandas
+from conftest import orders_csv
+from streaming import stream_aggregates
+
+# A sorted day-first export: only chunks reaching the 13th show the format
+DAY_FIRST = [f"{day:02d}/03/2023" for day in range(1, 29) for _ in range(4)]
+
+
+@pytest.mark.parametrize("chunk_rows", [8, 1_000])
+def test_chunk_size_parity(tmp_path, chunk_rows):
+    path = tmp_path / "orders.csv"
+    path.write_bytes(orders_csv(DAY_FIRST))
+    expected = summarize_pandas(str(path), None)
+    check_equal({name: expected[name] for name in CUBE_RESULTS}, stream_aggregates(str(path), chunk_rows).summary())
+
+
+def test_append_keeps_date_format(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "DATASET_DIR", str(tmp_path))
+    april = [f"{day:02d}/04/2023" for day in range(1, 13)]
+    datasets.append_orders("orders", orders_csv(DAY_FIRST), chunk_rows=8)
+    dataset, _ = datasets.append_orders("orders", orders_csv(april), chunk_rows=8)
+    months = dataset.summary()["monthly"].index
+    assert list(months) == [pd.Period("2023-03", "M").ordinal, pd.Period("2023-04", "M").ordinal]